@@ -0,0 +1,148 @@
+import numpy as np
+
+
+# Docelowy recall@k przy automatycznym doborze n_probe (tune_n_probe)
+TARGET_RECALL = 0.95
+
+
+def _balanced_assign(similarity, capacity):
+    """Przypisuje elementy do najpodobniejszych list, najwyżej capacity elementów na listę
+
+    Lista, która się zapełni, przyjmuje elementy najbardziej do niej podobne;
+    pozostałe trafiają do kolejnej najlepszej listy z wolnym miejscem.
+    """
+    n_items, n_lists = similarity.shape
+    assign = np.full(n_items, -1)
+    free = np.full(n_lists, capacity)
+    while (assign < 0).any():
+        pending = np.flatnonzero(assign < 0)
+        scores = similarity[pending]
+        scores[:, free == 0] = -np.inf
+        best = np.argmax(scores, axis=1)
+        order = np.lexsort((-scores[np.arange(len(pending)), best], best))
+        lists = best[order]
+        rank = np.arange(len(order)) - np.searchsorted(lists, lists)
+        accepted = rank < free[lists]
+        assign[pending[order[accepted]]] = lists[accepted]
+        free -= np.bincount(lists[accepted], minlength=n_lists)
+    return assign
+
+
+class IVFIndex:
+    """Indeks IVF (odwrócone listy) do przybliżonego wyszukiwania maksymalnego iloczynu skalarnego
+
+    Listy powstają sferycznym k-means na kierunkach wektorów (znormalizowanych),
+    a lista może mieć najwyżej balance * n / n_lists elementów, więc elementy
+    o małej normie nie zbierają się w jednej dużej liście. Zapytanie
+    przeszukuje n_probe list o największym iloczynie skalarnym ze średnią
+    wektorów listy (centroids). Większe n_probe = wyższy recall kosztem
+    czasu odpowiedzi; tune_n_probe dobiera je do zadanego recall.
+    """
+
+    def __init__(self, n_lists=None, n_probe=None, n_iter=10, balance=2.0, random_state=42):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.balance = balance
+        self.random_state = random_state
+        self.vectors = None
+        self.centroids = None
+        self.list_offsets = None
+        self.list_items = None
+
+    def fit(self, vectors):
+        """Buduje indeks nad wektorami (wiersze = elementy)"""
+        self.vectors = np.ascontiguousarray(vectors)
+        n_items = len(self.vectors)
+        n_lists = self.n_lists or max(1, int(np.sqrt(n_items)))
+        n_lists = min(n_lists, n_items)
+        capacity = int(np.ceil(self.balance * n_items / n_lists))
+
+        # Sferyczny k-means na kierunkach wektorów, z limitem rozmiaru list
+        norms = np.linalg.norm(self.vectors, axis=1)
+        unit = self.vectors / np.where(norms > 0, norms, 1)[:, None]
+        rng = np.random.default_rng(self.random_state)
+        directions = unit[rng.choice(n_items, n_lists, replace=False)]
+        for _ in range(self.n_iter):
+            assign = _balanced_assign(unit @ directions.T, capacity)
+            sums = np.zeros_like(directions)
+            np.add.at(sums, assign, unit)
+            lengths = np.linalg.norm(sums, axis=1)
+            non_empty = lengths > 0
+            directions[non_empty] = sums[non_empty] / lengths[non_empty, None]
+        assign = _balanced_assign(unit @ directions.T, capacity)
+        assign = np.unique(assign, return_inverse=True)[1]  # bez pustych list
+        n_lists = assign.max() + 1
+
+        # Listy zapisane jak w CSR: elementy posortowane wg listy + przesunięcia
+        self.list_items = np.argsort(assign, kind='stable')
+        self.list_offsets = np.searchsorted(assign[self.list_items], np.arange(n_lists + 1))
+        counts = np.diff(self.list_offsets)
+        self.centroids = np.zeros((n_lists, self.vectors.shape[1]), dtype=self.vectors.dtype)
+        np.add.at(self.centroids, assign, self.vectors)
+        self.centroids /= counts[:, None]
+        return self
+
+    def search(self, query, k, n_probe=None, exclude=None):
+        """Zwraca (indeksy, wyniki) k elementów o największym iloczynie skalarnym z query
+
+        exclude to opcjonalna tablica indeksów elementów do pominięcia.
+        n_probe=None oznacza self.n_probe, a gdy i ono nie jest ustawione - wszystkie listy.
+        """
+        n_probe = min(n_probe or self.n_probe or len(self.centroids), len(self.centroids))
+
+        # Listy, których średni wektor ma największy iloczyn skalarny z zapytaniem
+        list_scores = self.centroids @ query
+        probe = np.argpartition(-list_scores, n_probe - 1)[:n_probe]
+        candidates = np.concatenate([
+            self.list_items[self.list_offsets[i]:self.list_offsets[i + 1]] for i in probe
+        ])
+        if exclude is not None and len(exclude):
+            candidates = candidates[~np.isin(candidates, exclude)]
+
+        scores = self.vectors[candidates] @ query
+        if k < len(candidates):
+            top = np.argpartition(-scores, k - 1)[:k]
+            candidates, scores = candidates[top], scores[top]
+        order = np.lexsort((candidates, -scores))
+        return candidates[order], scores[order]
+
+    def tune_n_probe(self, queries, k, target_recall=TARGET_RECALL, excludes=None):
+        """Ustawia najmniejsze n_probe z recall@k >= target_recall na queries (względem wyszukiwania dokładnego)
+
+        Przeszukiwane listy przy większym n_probe zawierają te przy mniejszym,
+        więc recall rośnie z n_probe i wystarczy wyszukiwanie binarne.
+        """
+        low, high = 1, len(self.centroids)
+        while low < high:
+            middle = (low + high) // 2
+            if recall_at_k(self, queries, k, middle, excludes) >= target_recall:
+                high = middle
+            else:
+                low = middle + 1
+        self.n_probe = low
+        return low
+
+
+def brute_force_search(vectors, query, k, exclude=None):
+    """Dokładne wyszukiwanie k największych iloczynów skalarnych (punkt odniesienia)"""
+    scores = vectors @ query
+    if exclude is not None and len(exclude):
+        scores[exclude] = -np.inf
+    k = min(k, int(np.isfinite(scores).sum()))
+    top = np.argpartition(-scores, k - 1)[:k] if k else np.empty(0, dtype=int)
+    order = np.lexsort((top, -scores[top]))
+    return top[order], scores[top][order]
+
+
+def recall_at_k(index, queries, k, n_probe=None, excludes=None):
+    """Średni recall@k indeksu względem wyszukiwania dokładnego dla zbioru zapytań"""
+    recalls = []
+    for i, query in enumerate(queries):
+        exclude = excludes[i] if excludes is not None else None
+        exact, _ = brute_force_search(index.vectors, query, k, exclude)
+        if len(exact) == 0:
+            continue
+        approx, _ = index.search(query, k, n_probe, exclude)
+        recalls.append(len(np.intersect1d(exact, approx)) / len(exact))
+    return float(np.mean(recalls)) if recalls else 1.0
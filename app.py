@@ -1,24 +1,159 @@
 from flask import Flask, render_template, request, jsonify
-from movie_recommendation_system import MovieRecommendationSystem
+from movie_recommendation_system import MovieRecommendationSystem, MovieFilter, METHOD_NAMES
+from recommendation_cache import RecommendationCache
+from recommendation_store import RecommendationStore, materialize, store_available
+from async_serving import AsyncRecommendationService
+from sharded_serving import ShardedRecommendationService, partition, read_manifest
+from instrumentation import LogSink, SamplingProfiler
+import instrumentation
 import pandas as pd
+import os
 
 app = Flask(__name__)
 
 # Inicjalizacja systemu rekomendacji (globalnie)
 recommender = None
+store = None
 
-def init_recommender():
-    """Inicjalizuje system rekomendacji"""
+# Katalog z zapisanym modelem - wczytywany (mmap) zamiast trenowania przy starcie
+MODEL_DIR = os.environ.get('RECOMMENDER_MODEL_DIR', 'model')
+
+# Katalog z gotowymi listami top-N (materialize) - czytane przed liczeniem na żywo
+STORE_DIR = os.environ.get('RECOMMENDER_STORE_DIR', 'recommendations')
+
+# RECOMMENDER_QUANTIZE=int8 - czynniki SVD użytkowników w int8 (ok. 4x mniej pamięci)
+QUANTIZE_FACTORS = os.environ.get('RECOMMENDER_QUANTIZE') == 'int8'
+
+# Cache rekomendacji (LRU + TTL), unieważniany przy zmianie wersji modelu
+cache = RecommendationCache(
+    max_size=int(os.environ.get('RECOMMENDER_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('RECOMMENDER_CACHE_TTL', 300)),
+)
+
+# Tryb asynchroniczny (RECOMMENDER_SERVING=async): model przygotowywany w tle,
+# zapytania łączone i grupowane na pętli asyncio
+service = None
+if os.environ.get('RECOMMENDER_SERVING', 'sync') == 'async':
+    service = AsyncRecommendationService(
+        max_batch_size=int(os.environ.get('RECOMMENDER_BATCH_SIZE', 64)),
+        batch_window=float(os.environ.get('RECOMMENDER_BATCH_WINDOW', 0.002)),
+    )
+
+# Tryb shardowany (RECOMMENDER_SERVING=sharded): użytkownicy podzieleni wg hasha
+# user_id między RECOMMENDER_SHARDS lokalnych procesów, zapytania przez router
+shards = None
+SHARD_DIR = os.environ.get('RECOMMENDER_SHARD_DIR', 'shards')
+N_SHARDS = int(os.environ.get('RECOMMENDER_SHARDS', os.cpu_count() or 1))
+if os.environ.get('RECOMMENDER_SERVING') == 'sharded':
+    shards = ShardedRecommendationService(SHARD_DIR)
+
+# Pomiary etapów: RECOMMENDER_METRICS_LOG=1 wypisuje każdy pomiar do logu,
+# RECOMMENDER_TRACK_MEMORY=1 dodaje szczyt pamięci etapów trenowania
+if os.environ.get('RECOMMENDER_METRICS_LOG') == '1':
+    instrumentation.metrics.add_sink(LogSink())
+instrumentation.metrics.track_memory = os.environ.get('RECOMMENDER_TRACK_MEMORY') == '1'
+
+# Profiler próbkujący (RECOMMENDER_PROFILE=1) - stosy do flame graph pod /api/profile
+profiler = None
+if os.environ.get('RECOMMENDER_PROFILE') == '1':
+    profiler = SamplingProfiler(interval=float(os.environ.get('RECOMMENDER_PROFILE_INTERVAL', 0.01)))
+    profiler.start()
+
+def load_recommender():
+    """Wczytuje zapisany model (mmap) albo trenuje i zapisuje nowy; zwraca system lub None
+
+    Model w starszej wersji formatu (lub uszkodzony manifest) jest trenowany
+    od nowa i nadpisywany.
+    """
     global recommender
-    if recommender is None:
-        recommender = MovieRecommendationSystem()
-        if recommender.train_model():
-            print("✅ System rekomendacji załadowany!")
-        else:
+    if MovieRecommendationSystem.saved_model_available(MODEL_DIR):
+        loaded = MovieRecommendationSystem.load(MODEL_DIR)
+        print("✅ System rekomendacji wczytany z dysku!")
+    else:
+        loaded = MovieRecommendationSystem()
+        if not loaded.train_model():
             print("❌ Błąd podczas ładowania systemu")
-            recommender = None
+            return None
+        if QUANTIZE_FACTORS:
+            loaded.quantize_user_factors()
+        loaded.save(MODEL_DIR)
+        print("✅ System rekomendacji załadowany!")
+    if QUANTIZE_FACTORS and not loaded.factors_quantized:
+        # Model zapisany bez kwantyzacji - czynniki w pamięci kwantyzowane po wczytaniu
+        loaded.quantize_user_factors()
+    recommender = loaded
+    init_store()
+    if shards is not None:
+        init_shards()
+    return recommender
+
+def init_recommender():
+    """Inicjalizuje system rekomendacji
+
+    W trybie asynchronicznym model przygotowywany jest w tle od startu
+    aplikacji, więc żadne żądanie nie czeka na trenowanie.
+    """
+    if service is not None:
+        return service.ready
+    if recommender is None:
+        load_recommender()
     return recommender is not None
 
+def init_store():
+    """Otwiera magazyn rekomendacji; buduje go, jeśli brakuje go, jest w starszym formacie lub pochodzi z innego trenowania"""
+    global store
+    if store_available(STORE_DIR):
+        store = RecommendationStore.open(STORE_DIR)
+        if store.fitted_at == recommender.fitted_at:
+            return
+    store = materialize(recommender, STORE_DIR)
+
+def init_shards():
+    """Uruchamia procesy shardów; najpierw dzieli model, jeśli shardów brakuje lub pochodzą z innego trenowania"""
+    manifest = read_manifest(SHARD_DIR)
+    if manifest is None or manifest['fitted_at'] != recommender.fitted_at or manifest['n_shards'] != N_SHARDS:
+        partition(MODEL_DIR, SHARD_DIR, N_SHARDS)
+    shards.start()
+    print(f"✅ Uruchomiono {N_SHARDS} shardów")
+
+def serving():
+    """Obiekt liczący rekomendacje: router shardów albo system w tym procesie"""
+    return shards.router if shards is not None else recommender
+
+def parse_filters(args):
+    """Filtr kandydatów z parametrów zapytania (genre, director, min_year, max_year, exclude); None, gdy brak"""
+    filters = MovieFilter(
+        genres=args.getlist('genre'),
+        directors=args.getlist('director'),
+        min_year=args.get('min_year', type=int),
+        max_year=args.get('max_year', type=int),
+        exclude=[int(movie_id) for value in args.getlist('exclude') for movie_id in value.split(',') if movie_id],
+    )
+    return None if filters.empty else filters
+
+def get_recommendations(user_id, method='svd', n_recs=5, filters=None):
+    """Rekomendacje danej metody: z magazynu top-N, z cache albo liczone na żywo"""
+    if method not in METHOD_NAMES and method != 'metadata':
+        method = 'svd'
+    if filters is not None:
+        # Z filtrem liczone na żywo (magazyn i obsługa asynchroniczna są bez filtrów), cache wg filtra
+        compute = lambda: serving().recommend(user_id, method, n_recs, filters)
+        return cache.get_or_compute(user_id, (method, filters), n_recs, recommender.model_version, compute)
+    # Metadane nie przechodzą przez score_block - liczone bezpośrednio
+    if service is not None and method in METHOD_NAMES:
+        compute = lambda: service.submit(user_id, method, n_recs).result()
+    else:
+        compute = lambda: serving().recommend(user_id, method, n_recs)
+    if store is not None:
+        recs = store.lookup(recommender, user_id, method, n_recs)
+        if recs is not None:
+            return recs
+    return cache.get_or_compute(user_id, method, n_recs, recommender.model_version, compute)
+
+# Start przygotowania modelu w tle (tryb asynchroniczny)
+if service is not None:
+    service.start(load_recommender)
+
 @app.route('/')
 def index():
     """Strona główna"""
@@ -40,13 +175,15 @@ def user_profile(user_id):
     if user_id < 1 or user_id > 100:
         return jsonify({'error': 'Nieprawidłowy ID użytkownika'})
     
-    profile = recommender.get_user_profile(user_id)
+    profile = serving().get_user_profile(user_id)
     return render_template('user_profile.html', user_id=user_id, profile=profile)
 
 @app.route('/api/recommendations/<int:user_id>')
 def get_recommendations_api(user_id):
     """API dla rekomendacji"""
     if not init_recommender():
+        if service is not None and service.status == 'starting':
+            return jsonify({'error': 'System jest uruchamiany, spróbuj za chwilę'}), 503
         return jsonify({'error': 'System nie jest dostępny'})
     
     if user_id < 1 or user_id > 100:
@@ -56,14 +193,12 @@ def get_recommendations_api(user_id):
     n_recs = int(request.args.get('n', 5))
     
     try:
-        if method == 'collaborative':
-            recs = recommender.get_user_recommendations_collaborative(user_id, n_recs)
-        elif method == 'content':
-            recs = recommender.get_movie_recommendations_content(user_id, n_recs)
-        else:  # svd
-            recs = recommender.get_svd_recommendations(user_id, n_recs)
+        recs = get_recommendations(user_id, method, n_recs, parse_filters(request.args))
         
-        return jsonify({'recommendations': recs, 'user_id': user_id, 'method': method})
+        return jsonify({'recommendations': [item.to_dict() for item in recs],
+                        'message': recs.message,
+                        'user_id': user_id,
+                        'method': method})
     except Exception as e:
         return jsonify({'error': str(e)})
 
@@ -77,19 +212,20 @@ def recommendations(user_id):
         return render_template('error.html', message="Nieprawidłowy ID użytkownika")
     
     # Pobierz profil użytkownika
-    profile = recommender.get_user_profile(user_id)
+    profile = serving().get_user_profile(user_id)
     
-    # Pobierz rekomendacje ze wszystkich metod
-    collaborative_recs = recommender.get_user_recommendations_collaborative(user_id, 5)
-    content_recs = recommender.get_movie_recommendations_content(user_id, 5)
-    svd_recs = recommender.get_svd_recommendations(user_id, 5)
+    # Rekomendacje wszystkich metod w jednym przebiegu + lista hybrydowa
+    recs = cache.get_or_compute(user_id, 'hybrid', 5, recommender.model_version,
+                                lambda: serving().get_hybrid_recommendations(user_id, 5))
     
     return render_template('recommendations.html', 
                          user_id=user_id, 
                          profile=profile,
-                         collaborative_recs=collaborative_recs,
-                         content_recs=content_recs,
-                         svd_recs=svd_recs)
+                         collaborative_recs=recs.methods['collaborative'],
+                         content_recs=recs.methods['content'],
+                         svd_recs=recs.methods['svd'],
+                         als_recs=recs.methods['als'],
+                         hybrid_recs=recs.blended)
 
 @app.route('/movies')
 def movies_list():
@@ -117,6 +253,44 @@ def statistics():
     
     return render_template('stats.html', stats=stats)
 
+@app.route('/api/ready')
+def readiness():
+    """Gotowość serwisu (503 dopóki model nie jest wczytany/wytrenowany)"""
+    if service is not None:
+        status = service.status
+    else:
+        status = 'ready' if recommender is not None else 'not_loaded'
+    return jsonify({'ready': status == 'ready', 'status': status}), 200 if status == 'ready' else 503
+
+@app.route('/api/metrics')
+def metrics():
+    """Metryki serwisu (cache, obsługa asynchroniczna, czasy etapów)"""
+    result = {'cache': cache.stats(), 'stages': instrumentation.metrics.snapshot()}
+    if service is not None:
+        result['serving'] = service.stats()
+    if shards is not None:
+        result['shards'] = shards.stats()
+    return jsonify(result)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Metryki w formacie tekstowym Prometheusa"""
+    gauges = {f"cache_{name}": value for name, value in cache.stats().items()}
+    if service is not None:
+        gauges.update({f"serving_{name}": value for name, value in service.stats().items()})
+    if shards is not None:
+        gauges.update({f"shards_{name}": value for name, value in shards.stats().items()})
+    gauges = {name: value for name, value in gauges.items() if isinstance(value, (int, float))}
+    return instrumentation.metrics.to_prometheus(gauges=gauges), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
+@app.route('/api/profile')
+def profile():
+    """Próbki profilera w formacie collapsed stacks (flamegraph.pl, speedscope)"""
+    if profiler is None:
+        return jsonify({'error': 'Profiler wylaczony (RECOMMENDER_PROFILE=1)'}), 404
+    return profiler.collapsed(), 200, {'Content-Type': 'text/plain'}
+
 if __name__ == '__main__':
     print("🚀 Uruchamianie aplikacji webowej...")
-    app.run(debug=True, host='127.0.0.1', port=5000)
+    # W trybie asynchronicznym i shardowanym bez reloadera (model trenowany raz, procesy shardów startują raz)
+    app.run(debug=True, host='127.0.0.1', port=5000, use_reloader=service is None and shards is None)
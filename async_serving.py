@@ -0,0 +1,141 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from movie_recommendation_system import METHOD_NAMES, _top_n_indices
+
+
+class AsyncRecommendationService:
+    """Nieblokująca obsługa rekomendacji na pętli asyncio działającej w osobnym wątku
+
+    - model jest wczytywany/trenowany w tle po start(), status pokazuje
+      gotowość ('starting', 'ready', 'failed'),
+    - równoczesne zapytania o tego samego użytkownika, metodę i n są
+      łączone w jedno obliczenie,
+    - zapytania różnych użytkowników zebrane w oknie batch_window sekund
+      (lub do max_batch_size) są liczone jednym wywołaniem score_block,
+    - liczenie odbywa się w puli n_workers wątków (numpy zwalnia GIL),
+      więc pętla zdarzeń nigdy nie jest blokowana.
+    """
+
+    def __init__(self, max_batch_size=64, batch_window=0.002, n_workers=2):
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.recommender = None
+        self.status = 'stopped'
+        self.error = None
+        self.loop = None
+        self._executor = ThreadPoolExecutor(n_workers, thread_name_prefix='scoring')
+        self._inflight = {}
+        self._batches = {}
+        self.requests = 0
+        self.coalesced = 0
+        self.batches = 0
+
+    @property
+    def ready(self):
+        return self.status == 'ready'
+
+    def start(self, load):
+        """Uruchamia pętlę zdarzeń i w tle wywołuje load() (zwraca wytrenowany system lub None)"""
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name='recommendation-loop', daemon=True).start()
+        self.status = 'starting'
+        asyncio.run_coroutine_threadsafe(self._startup(load), self.loop)
+
+    async def _startup(self, load):
+        try:
+            self.recommender = await self.loop.run_in_executor(None, load)
+        except Exception as e:
+            self.error = str(e)
+        self.status = 'ready' if self.recommender is not None else 'failed'
+
+    def submit(self, user_id, method='svd', n_recommendations=5):
+        """Zleca rekomendacje z dowolnego wątku; zwraca concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(self.recommend(user_id, method, n_recommendations), self.loop)
+
+    async def recommend(self, user_id, method='svd', n_recommendations=5):
+        """Rekomendacje (RecommendationList) z łączeniem i grupowaniem zapytań"""
+        if not self.ready:
+            raise RuntimeError("Model nie jest jeszcze gotowy")
+        if method not in METHOD_NAMES:
+            raise ValueError(f"Nieznana metoda rekomendacji: {method}")
+        self.requests += 1
+
+        key = (user_id, method, n_recommendations)
+        future = self._inflight.get(key)
+        if future is None:
+            future = self.loop.create_future()
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self._enqueue(method, user_id, n_recommendations, future)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    def _enqueue(self, method, user_id, n_recommendations, future):
+        batch = self._batches.setdefault(method, [])
+        batch.append((user_id, n_recommendations, future))
+        if len(batch) >= self.max_batch_size:
+            self._flush(method)
+        elif len(batch) == 1:
+            self.loop.call_later(self.batch_window, self._flush, method)
+
+    def _flush(self, method):
+        batch = self._batches.pop(method, None)
+        if batch:
+            self.batches += 1
+            self.loop.create_task(self._run_batch(method, batch))
+
+    async def _run_batch(self, method, batch):
+        requests = [(user_id, n) for user_id, n, _ in batch]
+        try:
+            results = await self.loop.run_in_executor(self._executor, self._score_batch, method, requests)
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (*_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _score_batch(self, method, requests):
+        """Liczy rekomendacje grupy zapytań jednym wywołaniem score_block (w wątku puli)
+
+        Nieznani użytkownicy i puste listy przechodzą przez zwykłą ścieżkę
+        recommend(), która zwraca odpowiedni komunikat.
+        """
+        recommender = self.recommender
+        user_idx = recommender.user_index.get_indexer([user_id for user_id, _ in requests])
+        results = [None] * len(requests)
+
+        known = np.flatnonzero(user_idx >= 0)
+        if len(known):
+            block = np.unique(user_idx[known])
+            scores = recommender.score_block(block, method)
+            rows = np.searchsorted(block, user_idx)
+            for i in known:
+                user_id, n = requests[i]
+                row = scores[rows[i]]
+                top = _top_n_indices(row, n)
+                if len(top):
+                    results[i] = recommender._build_recommendations(user_id, top, row[top], METHOD_NAMES[method])
+
+        for i, (user_id, n) in enumerate(requests):
+            if results[i] is None:
+                results[i] = recommender.recommend(user_id, method, n)
+        return results
+
+    def stats(self):
+        """Stan i liczniki serwisu (do endpointów gotowości i metryk)"""
+        return {
+            'status': self.status,
+            'error': self.error,
+            'requests': self.requests,
+            'coalesced': self.coalesced,
+            'batches': self.batches,
+            'in_flight': len(self._inflight),
+        }
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Benchmark systemu rekomendacji
+==============================
+
+Generuje syntetyczne dane w kilku skalach (liczba ocen), mierzy czas
+i szczytową pamięć wczytania danych i fit() (z czasami jego kroków) oraz opóźnienia
+(p50/p95/p99) pojedynczych zapytań dla każdej metody rekomendacji.
+Wyniki zapisywane są do pliku JSON, który można porównać z poprzednim
+przebiegiem (--compare).
+
+    python benchmark.py --scales 1e3 1e4 1e5 --output benchmark_results.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import scipy
+import sklearn
+
+from generate_movie_data import write_dataset
+from instrumentation import metrics, peak_rss_bytes
+from movie_recommendation_system import MovieRecommendationSystem
+
+# Średnio ok. 16 ocen na użytkownika (generator: 8-24 filmów)
+RATINGS_PER_USER = 16
+
+# Stała data najnowszej oceny - dane benchmarku są w pełni powtarzalne
+DATA_END_TIME = '2025-01-01'
+
+RECOMMENDERS = {
+    'collaborative': 'get_user_recommendations_collaborative',
+    'content': 'get_movie_recommendations_content',
+    'svd': 'get_svd_recommendations',
+    'als': 'get_als_recommendations',
+    'metadata': 'get_metadata_recommendations',
+    'hybrid': 'get_hybrid_recommendations',
+}
+
+
+def dataset_size(n_ratings):
+    """Liczba użytkowników i filmów dla zadanej liczby ocen"""
+    n_users = max(10, n_ratings // RATINGS_PER_USER)
+    n_movies = max(30, int(np.sqrt(n_ratings)))
+    return n_users, n_movies
+
+
+def prepare_dataset(n_ratings, data_root, seed=42):
+    """Zwraca katalog z danymi danej skali (generuje je przy pierwszym użyciu)"""
+    data_dir = os.path.join(data_root, f"ratings_{n_ratings}")
+    if not os.path.exists(os.path.join(data_dir, 'ratings.csv')):
+        n_users, n_movies = dataset_size(n_ratings)
+        print(f"Generowanie danych: {n_users} uzytkownikow, {n_movies} filmow...")
+        write_dataset(data_dir, n_users, n_movies, seed, end_time=DATA_END_TIME)
+    return data_dir
+
+
+def measure(func, *args, **kwargs):
+    """Wykonuje funkcję, zwracając (czas w s, szczyt pamięci zaalokowanej w trakcie w MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': seconds, 'peak_mb': peak / 2 ** 20}
+
+
+def peak_rss_mb():
+    """Szczytowe zużycie pamięci procesu (RSS) w MB"""
+    peak = peak_rss_bytes()
+    return None if peak is None else peak / 2 ** 20
+
+
+def benchmark_training(recommender, data_dir, similarity_top_k=None, n_jobs=1):
+    """Mierzy wczytanie danych i fit() - te same kroki co train_model
+
+    Zwraca (etapy, czasy kroków fit() z metrics, np. 'train.svd').
+    """
+    training = {'load_data': measure(recommender.load_data, data_dir)}
+    metrics.reset()
+    training['fit'] = measure(recommender.fit, similarity_top_k, n_jobs)
+    steps = {name: timer['total_seconds'] for name, timer in metrics.snapshot()['timers'].items()
+             if name.startswith('train.') and name != 'train.fit'}
+    return training, steps
+
+
+def benchmark_latency(recommender, n_requests=200, n_recommendations=10, seed=42):
+    """Opóźnienia pojedynczych zapytań (ms) dla losowych użytkowników"""
+    rng = np.random.default_rng(seed)
+    user_ids = rng.choice(recommender.user_index.to_numpy(), n_requests)
+
+    latency = {}
+    for method, name in RECOMMENDERS.items():
+        recommend = getattr(recommender, name)
+        timings = []
+        for user_id in user_ids:
+            start = time.perf_counter()
+            recommend(int(user_id), n_recommendations)
+            timings.append((time.perf_counter() - start) * 1000)
+        p50, p95, p99 = np.percentile(timings, [50, 95, 99]).tolist()
+        latency[method] = {'p50': p50, 'p95': p95, 'p99': p99, 'mean': float(np.mean(timings))}
+    return latency
+
+
+def run_benchmark(scales, data_root='benchmark_data', similarity_top_k=50, n_jobs=1,
+                  n_requests=200, label=None):
+    """Uruchamia benchmark dla kolejnych skal i zwraca wyniki (słownik do zapisu w JSON)"""
+    results = []
+    for n_ratings in scales:
+        data_dir = prepare_dataset(n_ratings, data_root)
+        print(f"\nSkala {n_ratings} ocen")
+
+        recommender = MovieRecommendationSystem()
+        training, training_steps = benchmark_training(recommender, data_dir, similarity_top_k, n_jobs)
+        latency = benchmark_latency(recommender, n_requests)
+
+        n_users, n_movies = recommender.user_movie_matrix.shape
+        results.append({
+            'scale': n_ratings,
+            'n_users': n_users,
+            'n_movies': n_movies,
+            'n_ratings': int(recommender.user_movie_matrix.nnz),
+            'training': training,
+            'training_steps_seconds': training_steps,
+            'training_seconds': sum(stage['seconds'] for stage in training.values()),
+            'peak_rss_mb': peak_rss_mb(),
+            'latency_ms': latency,
+        })
+        print(f"  trenowanie: {results[-1]['training_seconds']:.2f} s")
+        for method, values in latency.items():
+            print(f"  {method:<14} p50 {values['p50']:.2f} ms | p95 {values['p95']:.2f} ms | p99 {values['p99']:.2f} ms")
+
+    return {
+        'label': label,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'scipy': scipy.__version__,
+            'scikit-learn': sklearn.__version__,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+        },
+        'settings': {'similarity_top_k': similarity_top_k, 'n_jobs': n_jobs, 'n_requests': n_requests},
+        'results': results,
+    }
+
+
+def compare(current, baseline):
+    """Wypisuje zmianę czasu trenowania i opóźnień p95 względem poprzedniego przebiegu"""
+    previous = {result['scale']: result for result in baseline['results']}
+    print(f"\nPorownanie z: {baseline.get('label') or baseline['created']}")
+    for result in current['results']:
+        old = previous.get(result['scale'])
+        if old is None:
+            continue
+        ratio = result['training_seconds'] / old['training_seconds']
+        print(f"Skala {result['scale']}: trenowanie x{ratio:.2f}")
+        for method, values in result['latency_ms'].items():
+            if method not in old['latency_ms']:
+                continue
+            print(f"  {method:<14} p95 x{values['p95'] / old['latency_ms'][method]['p95']:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark systemu rekomendacji")
+    parser.add_argument('--scales', nargs='+', type=float, default=[1e3, 1e4, 1e5],
+                        help="liczby ocen (np. 1e3 1e4 1e5 1e6)")
+    parser.add_argument('--data-dir', default='benchmark_data')
+    parser.add_argument('--top-k', type=int, default=50,
+                        help="liczba sasiadow w podobienstwie (0 = pelne podobienstwo)")
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument('--requests', type=int, default=200, help="liczba zapytan na metode")
+    parser.add_argument('--label', help="opis przebiegu (np. wersja)")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help="plik z wynikami poprzedniego przebiegu")
+    args = parser.parse_args()
+
+    results = run_benchmark(
+        [int(scale) for scale in args.scales], args.data_dir,
+        args.top_k or None, args.jobs, args.requests, args.label
+    )
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWyniki zapisane w {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
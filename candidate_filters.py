@@ -0,0 +1,131 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from item_features import YEAR_BUCKET
+
+
+@dataclass(frozen=True)
+class MovieFilter:
+    """Ograniczenia kandydatów do rekomendacji
+
+    Film przechodzi, gdy ma jeden z genres i jednego z directors (puste =
+    bez ograniczenia), rok w [min_year, max_year] i nie ma go w exclude
+    (movie_id). Listy zamieniane są na krotki, więc filtr może być kluczem cache.
+    """
+    genres: tuple = ()
+    directors: tuple = ()
+    min_year: int = None
+    max_year: int = None
+    exclude: tuple = ()
+
+    def __post_init__(self):
+        for name in ('genres', 'directors', 'exclude'):
+            object.__setattr__(self, name, tuple(getattr(self, name)))
+
+    @property
+    def empty(self):
+        return not (self.genres or self.directors or self.exclude
+                    or self.min_year is not None or self.max_year is not None)
+
+
+def _pack(members, n_items):
+    """Spakowany zbiór bitów (jak np.packbits) z ustawionymi pozycjami members"""
+    bits = np.zeros((n_items + 7) // 8, dtype=np.uint8)
+    members = np.asarray(members, dtype=np.int64)
+    np.bitwise_or.at(bits, members >> 3, (0x80 >> (members & 7)).astype(np.uint8))
+    return bits
+
+
+class BitmapIndex:
+    """Spakowane bitmapy filmów (8 na bajt) dla każdego gatunku, reżysera i przedziału lat
+
+    Pozycja bitu to pozycja filmu w movie_ids (np. kolumna macierzy ocen).
+    Filtr to kilka operacji OR/AND na bajtach, a rozpakowana maska łączona
+    jest z maską filmów ocenionych przed wyborem top-N. Brakujące metadane
+    nie pasują do żadnego filtra danego pola. Bitmapy są jedną tablicą
+    (klucz x bajty), więc można ją zapisać i mapować z dysku.
+    """
+
+    def __init__(self, movie_ids, years, bitmaps, keys, year_bucket=YEAR_BUCKET):
+        self.movie_ids = pd.Index(movie_ids)
+        self.n_items = len(self.movie_ids)
+        self.years = years
+        self.bitmaps = bitmaps
+        self.keys = keys
+        self.year_bucket = year_bucket
+        self._rows = {tuple(key): row for row, key in enumerate(keys)}
+
+    @classmethod
+    def build(cls, movie_ids, genres, directors, years, year_bucket=YEAR_BUCKET):
+        """Buduje bitmapy z metadanych filmów (tablice w kolejności movie_ids)"""
+        years = np.asarray(years, dtype=np.float64)
+        n_items = len(movie_ids)
+        bitmaps, keys = [], []
+        for field, values in (('genre', genres), ('director', directors), ('year', years // year_bucket * year_bucket)):
+            codes, categories = pd.factorize(pd.Series(values))
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(categories) + 1))
+            for i, category in enumerate(categories):
+                bitmaps.append(_pack(order[bounds[i]:bounds[i + 1]], n_items))
+                keys.append((field, category.item() if hasattr(category, 'item') else category))
+        bitmaps = np.array(bitmaps, dtype=np.uint8).reshape(len(keys), (n_items + 7) // 8)
+        return cls(movie_ids, years, bitmaps, keys, year_bucket)
+
+    @classmethod
+    def from_movies(cls, movies_df, movie_ids, year_bucket=YEAR_BUCKET):
+        """Indeks dla movie_ids (w tej kolejności) z metadanymi z movies_df"""
+        movies = movies_df.drop_duplicates('movie_id').set_index('movie_id').reindex(movie_ids)
+        return cls.build(movie_ids, movies['genre'].to_numpy(), movies['director'].to_numpy(),
+                         movies['year'].to_numpy(), year_bucket)
+
+    def _field(self, field):
+        """{wartość: bitmapa} dla pola ('genre', 'director' lub 'year')"""
+        return {key[1]: self.bitmaps[row] for key, row in self._rows.items() if key[0] == field}
+
+    def _any_of(self, field, values):
+        bits = np.zeros((self.n_items + 7) // 8, dtype=np.uint8)
+        for value in values:
+            row = self._rows.get((field, value))
+            if row is not None:
+                bits |= self.bitmaps[row]
+        return bits
+
+    def _year_range(self, min_year, max_year):
+        low = -np.inf if min_year is None else min_year
+        high = np.inf if max_year is None else max_year
+        bits = np.zeros((self.n_items + 7) // 8, dtype=np.uint8)
+        for start, bucket in self._field('year').items():
+            stop = start + self.year_bucket - 1
+            if low <= start and stop <= high:
+                bits |= bucket
+            elif start <= high and low <= stop:
+                # Przedział na granicy zakresu - dokładne sprawdzenie lat jego filmów
+                members = np.flatnonzero(np.unpackbits(bucket, count=self.n_items))
+                members = members[(self.years[members] >= low) & (self.years[members] <= high)]
+                bits |= _pack(members, self.n_items)
+        return bits
+
+    def allowed(self, movie_filter):
+        """Spakowane bity filmów spełniających filtr; None, gdy filtr niczego nie ogranicza"""
+        if movie_filter is None or movie_filter.empty:
+            return None
+        bits = np.full((self.n_items + 7) // 8, 0xFF, dtype=np.uint8)
+        if movie_filter.genres:
+            bits &= self._any_of('genre', movie_filter.genres)
+        if movie_filter.directors:
+            bits &= self._any_of('director', movie_filter.directors)
+        if movie_filter.min_year is not None or movie_filter.max_year is not None:
+            bits &= self._year_range(movie_filter.min_year, movie_filter.max_year)
+        if movie_filter.exclude:
+            positions = self.movie_ids.get_indexer(list(movie_filter.exclude))
+            bits &= ~_pack(positions[positions >= 0], self.n_items)
+        return bits
+
+    def excluded(self, movie_filter):
+        """Maska (bool, długość n_items) filmów odrzuconych przez filtr; None dla pustego filtra"""
+        bits = self.allowed(movie_filter)
+        if bits is None:
+            return None
+        return np.unpackbits(bits, count=self.n_items) == 0
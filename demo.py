@@ -67,9 +67,7 @@ def interactive_demo():
                 print("\n🎬 WSZYSTKIE REKOMENDACJE DLA UŻYTKOWNIKA", user_id)
                 print("=" * 60)
                 print(recommender.get_user_profile(user_id))
-                print(recommender.get_user_recommendations_collaborative(user_id, n))
-                print(recommender.get_movie_recommendations_content(user_id, n))
-                print(recommender.get_svd_recommendations(user_id, n))
+                print(recommender.get_hybrid_recommendations(user_id, n))
         elif choice == "6":
             show_movie_list(recommender)
         elif choice == "7":
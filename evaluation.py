@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Ocena jakości systemu rekomendacji
+==================================
+
+Modele są trenowane wyłącznie na części treningowej ocen, a mierzone na
+odłożonej części testowej: RMSE przewidywanych ocen oraz precision@K,
+recall@K, NDCG@K i MAP@K dla wszystkich metod rekomendacji.
+"""
+
+import contextlib
+import io
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from movie_recommendation_system import MovieRecommendationSystem, _top_n_indices
+from ratings_io import read_ratings
+
+# Metody zwracające przewidywaną ocenę (dla pozostałych RMSE nie ma sensu)
+RATING_METHODS = ('collaborative', 'svd', 'als')
+
+
+def split_ratings(ratings_df, method='random', test_size=0.2, random_state=42):
+    """Dzieli oceny na część treningową i testową (bez pętli po wierszach)
+
+    - 'random': losowe oceny,
+    - 'user': z każdego użytkownika odkładany jest odsetek test_size jego ocen
+      (co najmniej jedna ocena zostaje w części treningowej),
+    - 'temporal': do testu trafiają najnowsze oceny wg timestamp.
+    """
+    rng = np.random.default_rng(random_state)
+    n = len(ratings_df)
+
+    if method == 'random':
+        test = rng.random(n) < test_size
+
+    elif method == 'user':
+        users = ratings_df['user_id'].to_numpy()
+        order = np.lexsort((rng.random(n), users))
+        _, starts, counts = np.unique(users[order], return_index=True, return_counts=True)
+        ranks = np.arange(n) - np.repeat(starts, counts)
+        n_test = np.minimum(np.floor(counts * test_size), counts - 1)
+        test = np.empty(n, dtype=bool)
+        test[order] = ranks < np.repeat(n_test, counts)
+
+    elif method == 'temporal':
+        timestamps = ratings_df['timestamp'].to_numpy()
+        cutoff = np.quantile(timestamps, 1 - test_size)
+        test = timestamps > cutoff
+
+    else:
+        raise ValueError(f"Nieznany sposob podzialu: {method}")
+
+    return ratings_df[~test], ratings_df[test]
+
+
+def k_fold_splits(ratings_df, n_folds=5, random_state=42):
+    """Zwraca listę par (trening, test) dla walidacji krzyżowej k-krotnej"""
+    rng = np.random.default_rng(random_state)
+    folds = rng.permutation(len(ratings_df)) % n_folds
+    return [(ratings_df[folds != fold], ratings_df[folds == fold]) for fold in range(n_folds)]
+
+
+def fit_on(train_df, movies_df, users_df, **fit_kwargs):
+    """Trenuje nowy system rekomendacji tylko na podanych ocenach"""
+    recommender = MovieRecommendationSystem()
+    recommender.movies_df = movies_df
+    recommender.users_df = users_df
+    recommender.ratings_df = train_df.reset_index(drop=True)
+    recommender.create_lookups()
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender.fit(**fit_kwargs)
+    return recommender
+
+
+def _ranking_metrics(top, relevant, n_relevant, k):
+    """Metryki rankingowe dla bloku użytkowników
+
+    top - indeksy rekomendacji (blok x k, -1 = brak), relevant - maska
+    trafień w tych pozycjach, n_relevant - liczba istotnych filmów użytkownika.
+    """
+    hits = relevant & (top >= 0)
+    n_hits = hits.sum(axis=1)
+    positions = np.arange(1, k + 1)
+
+    precision = n_hits / k
+    recall = n_hits / n_relevant
+
+    discounts = 1 / np.log2(positions + 1)
+    dcg = (hits * discounts).sum(axis=1)
+    idcg = np.cumsum(discounts)[np.minimum(n_relevant, k) - 1]
+    ndcg = dcg / idcg
+
+    precision_at_i = np.cumsum(hits, axis=1) / positions
+    average_precision = (precision_at_i * hits).sum(axis=1) / np.minimum(n_relevant, k)
+    return precision, recall, ndcg, average_precision
+
+
+def evaluate(recommender, test_df, k=10, methods=MovieRecommendationSystem.SCORING_METHODS,
+             relevance_threshold=4, chunk_size=1000, n_neighbors=None):
+    """Mierzy jakość wytrenowanego systemu na ocenach testowych
+
+    Użytkownicy są oceniani blokami (jedno wywołanie score_block na blok).
+    Pary spoza map indeksów modelu (nowi użytkownicy/filmy) są pomijane.
+    Za istotne uznawane są filmy z oceną testową >= relevance_threshold.
+    """
+    rows = recommender.user_index.get_indexer(test_df['user_id'])
+    cols = recommender.movie_index.get_indexer(test_df['movie_id'])
+    known = (rows >= 0) & (cols >= 0)
+    rows, cols = rows[known], cols[known]
+    ratings = test_df['rating'].to_numpy(dtype=np.float64)[known]
+
+    shape = recommender.user_movie_matrix.shape
+    test_matrix = sparse.csr_matrix((ratings, (rows, cols)), shape=shape)
+    relevant_matrix = sparse.csr_matrix(
+        ((ratings >= relevance_threshold).astype(np.float64), (rows, cols)), shape=shape
+    )
+    relevant_matrix.eliminate_zeros()
+    test_users = np.unique(rows)
+
+    results = {}
+    for method in methods:
+        squared_errors, n_predicted = 0.0, 0
+        metrics = []
+
+        for start in range(0, len(test_users), chunk_size):
+            block = test_users[start:start + chunk_size]
+            scores = recommender.score_block(block, method, n_neighbors)
+
+            # RMSE na parach testowych, dla których metoda daje przewidywanie
+            if method in RATING_METHODS:
+                block_test = test_matrix[block].tocoo()
+                predicted = scores[block_test.row, block_test.col]
+                valid = np.isfinite(predicted)
+                squared_errors += ((predicted[valid] - block_test.data[valid]) ** 2).sum()
+                n_predicted += valid.sum()
+
+            # Ranking tylko dla użytkowników z istotnymi filmami w teście
+            relevant = relevant_matrix[block].toarray() > 0
+            n_relevant = relevant.sum(axis=1)
+            has_relevant = n_relevant > 0
+            if not has_relevant.any():
+                continue
+
+            top = np.full((has_relevant.sum(), k), -1)
+            for i, row in enumerate(scores[has_relevant]):
+                indices = _top_n_indices(row, k)
+                top[i, :len(indices)] = indices
+            hits = np.take_along_axis(relevant[has_relevant], np.maximum(top, 0), axis=1)
+            metrics.append(np.column_stack(_ranking_metrics(top, hits, n_relevant[has_relevant], k)))
+
+        metrics = np.vstack(metrics).mean(axis=0) if metrics else np.full(4, np.nan)
+        results[method] = {
+            'rmse': float(np.sqrt(squared_errors / n_predicted)) if n_predicted else None,
+            f'precision@{k}': float(metrics[0]),
+            f'recall@{k}': float(metrics[1]),
+            f'ndcg@{k}': float(metrics[2]),
+            f'map@{k}': float(metrics[3]),
+        }
+    return results
+
+
+def _evaluate_fold(args):
+    train_df, test_df, movies_df, users_df, k, fit_kwargs = args
+    recommender = fit_on(train_df, movies_df, users_df, **fit_kwargs)
+    return evaluate(recommender, test_df, k)
+
+
+def cross_validate(ratings_df, movies_df, users_df, n_folds=5, k=10, n_jobs=1,
+                   random_state=42, **fit_kwargs):
+    """Walidacja krzyżowa k-krotna; kolejne foldy mogą być liczone w osobnych procesach
+
+    Zwraca średnie metryki dla każdej metody.
+    """
+    tasks = [
+        (train_df, test_df, movies_df, users_df, k, fit_kwargs)
+        for train_df, test_df in k_fold_splits(ratings_df, n_folds, random_state)
+    ]
+    if n_jobs == 1:
+        fold_results = [_evaluate_fold(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=None if n_jobs == -1 else n_jobs) as pool:
+            fold_results = list(pool.map(_evaluate_fold, tasks))
+
+    summary = {}
+    for method in fold_results[0]:
+        summary[method] = {
+            metric: (float(np.mean([fold[method][metric] for fold in fold_results]))
+                     if fold_results[0][method][metric] is not None else None)
+            for metric in fold_results[0][method]
+        }
+    return summary
+
+
+def print_results(results):
+    """Wypisuje tabelę metryk"""
+    metrics = list(next(iter(results.values())))
+    print(f"{'metoda':<15}" + "".join(f"{name:>14}" for name in metrics))
+    for method, values in results.items():
+        cells = "".join(f"{'-':>14}" if values[name] is None else f"{values[name]:>14.4f}" for name in metrics)
+        print(f"{method:<15}{cells}")
+
+
+if __name__ == "__main__":
+    movies_df = pd.read_csv('movies.csv')
+    users_df = pd.read_csv('users.csv')
+    ratings_df = read_ratings('ratings.csv')
+
+    for split in ('random', 'user', 'temporal'):
+        train_df, test_df = split_ratings(ratings_df, split)
+        print(f"\nPodzial '{split}': {len(train_df)} ocen treningowych, {len(test_df)} testowych")
+        print_results(evaluate(fit_on(train_df, movies_df, users_df), test_df))
+
+    n_jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    print(f"\nWalidacja krzyzowa 5-krotna (procesy: {n_jobs})")
+    print_results(cross_validate(ratings_df, movies_df, users_df, n_jobs=n_jobs))
@@ -0,0 +1,172 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy import sparse
+
+# Maksymalna liczba ocen w jednym bloku rozwiązań (ogranicza pamięć iloczynów zewnętrznych)
+SOLVE_BLOCK_NNZ = 20_000
+
+
+def _row_blocks(matrix, rows, nnz_budget=SOLVE_BLOCK_NNZ):
+    """Dzieli wiersze na bloki o łącznej liczbie ocen ok. nnz_budget"""
+    counts = np.diff(matrix.indptr)[rows]
+    cumulative = np.concatenate([[0], np.cumsum(counts)])
+    bounds = np.unique(np.searchsorted(cumulative, np.arange(0, cumulative[-1], nnz_budget), side='right') - 1)
+    bounds = np.unique(np.concatenate([bounds, [len(rows)]]))
+    return [rows[start:stop] for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+
+def _solve_block(matrix, rows, fixed, fixed_bias, global_mean, regularization):
+    """Regresje grzbietowe dla bloku wierszy macierzy ocen (CSR) przy ustalonej drugiej stronie
+
+    Dla wiersza u rozwiązywane jest (F_u^T F_u + lambda * n_u * I) x_u = F_u^T t_u,
+    gdzie F_u to czynniki ocenionych elementów z dopisaną kolumną jedynek
+    (ostatnia współrzędna x_u to obciążenie), a t_u = ocena - średnia -
+    obciążenie elementu. Wszystkie wiersze bloku jednym wywołaniem
+    np.linalg.solve.
+    """
+    block = matrix[rows]
+    counts = np.diff(block.indptr)
+    features = np.hstack([fixed, np.ones((len(fixed), 1))])[block.indices]
+    target = block.data - global_mean - fixed_bias[block.indices]
+
+    # Macierz wskaźników (wiersz bloku x ocena) sumuje iloczyny zewnętrzne po wierszach
+    indicator = sparse.csr_matrix((np.ones(block.nnz), np.arange(block.nnz), block.indptr),
+                                  shape=(len(rows), block.nnz))
+    n_features = features.shape[1]
+    gram = indicator @ (features[:, :, None] * features[:, None, :]).reshape(block.nnz, -1)
+    gram = gram.reshape(len(rows), n_features, n_features)
+    gram += regularization * np.maximum(counts, 1)[:, None, None] * np.eye(n_features)
+    rhs = indicator @ (features * target[:, None])
+
+    solution = np.linalg.solve(gram, rhs[:, :, None])[:, :, 0]
+    return solution[:, :-1], solution[:, -1]
+
+
+class ALSModel:
+    """Faktoryzacja macierzy ocen metodą ALS (naprzemienne najmniejsze kwadraty) tylko na ocenach obserwowanych
+
+    Przewidywana ocena: średnia + b_u + b_i + p_u . q_i. Brakujące oceny nie
+    są traktowane jak zera. Czynniki użytkowników i filmów liczone są
+    naprzemiennie blokami, a bloki mogą być rozwiązywane w n_jobs wątkach
+    (numpy zwalnia GIL). Przy podanym zbiorze walidacyjnym trenowanie
+    kończy się, gdy RMSE walidacji nie poprawia się przez early_stopping
+    iteracji; zachowywany jest najlepszy stan.
+    """
+
+    def __init__(self, n_factors=20, regularization=0.1, n_iter=15, early_stopping=3, n_jobs=1,
+                 random_state=42):
+        self.n_factors = n_factors
+        self.regularization = regularization
+        self.n_iter = n_iter
+        self.early_stopping = early_stopping
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.global_mean = 0.0
+        self.user_factors = None
+        self.item_factors = None
+        self.user_bias = None
+        self.item_bias = None
+        self.best_iter = None
+        self.validation_rmse = None
+        self.history = []
+
+    def _solve(self, matrix, rows, fixed, fixed_bias):
+        """Czynniki i obciążenia dla wskazanych wierszy matrix (użytkownicy lub filmy)"""
+        factors = np.zeros((len(rows), self.n_factors))
+        bias = np.zeros(len(rows))
+        blocks = _row_blocks(matrix, np.asarray(rows))
+        solve = lambda block: _solve_block(matrix, block, fixed, fixed_bias, self.global_mean, self.regularization)
+
+        n_jobs = os.cpu_count() if self.n_jobs == -1 else self.n_jobs
+        if n_jobs == 1 or len(blocks) <= 1:
+            results = map(solve, blocks)
+        else:
+            with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+                results = list(pool.map(solve, blocks))
+
+        start = 0
+        for (block_factors, block_bias), block in zip(results, blocks):
+            factors[start:start + len(block)] = block_factors
+            bias[start:start + len(block)] = block_bias
+            start += len(block)
+        return factors, bias
+
+    def fit(self, ratings, validation=None):
+        """Trenuje model na macierzy ocen (użytkownicy x filmy, CSR; zera = brak oceny)
+
+        validation to opcjonalna trójka (wiersze, kolumny, oceny) do
+        wczesnego zatrzymania.
+        """
+        ratings = sparse.csr_matrix(ratings, dtype=np.float64)
+        ratings_t = ratings.T.tocsr()
+        n_users, n_items = ratings.shape
+        rng = np.random.default_rng(self.random_state)
+
+        self.global_mean = float(ratings.data.mean()) if ratings.nnz else 0.0
+        self.user_factors = rng.normal(0, 0.1, (n_users, self.n_factors))
+        self.item_factors = rng.normal(0, 0.1, (n_items, self.n_factors))
+        self.user_bias = np.zeros(n_users)
+        self.item_bias = np.zeros(n_items)
+        all_users, all_items = np.arange(n_users), np.arange(n_items)
+
+        best, since_best = None, 0
+        self.history = []
+        self.best_iter = self.n_iter
+        for iteration in range(1, self.n_iter + 1):
+            self.user_factors, self.user_bias = self._solve(ratings, all_users, self.item_factors, self.item_bias)
+            self.item_factors, self.item_bias = self._solve(ratings_t, all_items, self.user_factors, self.user_bias)
+            if validation is None:
+                continue
+
+            rmse = self.rmse(*validation)
+            self.history.append(rmse)
+            if best is None or rmse < best[0]:
+                best = (rmse, iteration, self.user_factors, self.item_factors, self.user_bias, self.item_bias)
+                since_best = 0
+            else:
+                since_best += 1
+                if since_best >= self.early_stopping:
+                    break
+
+        if best is not None:
+            (self.validation_rmse, self.best_iter, self.user_factors, self.item_factors,
+             self.user_bias, self.item_bias) = best
+        return self
+
+    def predict(self, rows, cols):
+        """Przewidywane oceny dla par (użytkownik, film)"""
+        return (self.global_mean + self.user_bias[rows] + self.item_bias[cols]
+                + np.einsum('ij,ij->i', self.user_factors[rows], self.item_factors[cols]))
+
+    def predict_block(self, user_idx):
+        """Przewidywane oceny bloku użytkowników dla wszystkich filmów (blok x filmy)"""
+        return (self.global_mean + self.user_bias[user_idx, None] + self.item_bias[None, :]
+                + self.user_factors[user_idx] @ self.item_factors.T)
+
+    def rmse(self, rows, cols, values):
+        if len(values) == 0:
+            return 0.0
+        return float(np.sqrt(np.mean((self.predict(rows, cols) - values) ** 2)))
+
+    def resize(self, n_users, n_items):
+        """Dopisuje zerowe czynniki dla nowych użytkowników i filmów (kopie - tablice mogą być z mmap)"""
+        extra_users = n_users - len(self.user_factors)
+        extra_items = n_items - len(self.item_factors)
+        self.user_factors = np.vstack([self.user_factors, np.zeros((extra_users, self.n_factors))])
+        self.user_bias = np.concatenate([self.user_bias, np.zeros(extra_users)])
+        self.item_factors = np.vstack([self.item_factors, np.zeros((extra_items, self.n_factors))])
+        self.item_bias = np.concatenate([self.item_bias, np.zeros(extra_items)])
+
+    def update_users(self, ratings, rows):
+        """Przelicza czynniki wskazanych użytkowników przy ustalonych czynnikach filmów"""
+        factors, bias = self._solve(sparse.csr_matrix(ratings, dtype=np.float64), np.asarray(rows),
+                                    self.item_factors, self.item_bias)
+        self.user_factors[rows], self.user_bias[rows] = factors, bias
+
+    def update_items(self, ratings_t, rows):
+        """Przelicza czynniki wskazanych filmów (ratings_t: filmy x użytkownicy) przy ustalonych użytkownikach"""
+        factors, bias = self._solve(sparse.csr_matrix(ratings_t, dtype=np.float64), np.asarray(rows),
+                                    self.user_factors, self.user_bias)
+        self.item_factors[rows], self.item_bias[rows] = factors, bias
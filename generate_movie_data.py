@@ -1,11 +1,9 @@
 import pandas as pd
 import numpy as np
-import random
-from datetime import datetime, timedelta
-
-# Ustawiamy seed dla powtarzalności wyników
-np.random.seed(42)
-random.seed(42)
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 # Lista przykładowych filmów z gatunkami
 movies_data = [
@@ -41,76 +39,338 @@ movies_data = [
     {"title": "Spider-Man: Into the Spider-Verse", "genre": "Animation", "year": 2018, "director": "Peter Ramsey"}
 ]
 
-# Tworzenie DataFrame z filmami
-movies_df = pd.DataFrame(movies_data)
-movies_df['movie_id'] = range(1, len(movies_df) + 1)
-
-# Generowanie użytkowników
-users_data = []
-for i in range(1, 101):  # 100 użytkowników
-    age = np.random.randint(18, 65)
-    gender = np.random.choice(['M', 'F', 'Other'])
-    users_data.append({
-        'user_id': i,
-        'age': age,
-        'gender': gender
-    })
+# Pule do generowania dodatkowych filmów (gdy katalog ma być większy niż lista powyżej)
+GENRES = sorted({movie["genre"] for movie in movies_data})
+DIRECTORS = sorted({movie["director"] for movie in movies_data})
+
+# Rozkłady ocen: film z preferowanego gatunku / pozostałe filmy (oceny 1-5)
+PREFERRED_RATING_P = [0.0, 0.0, 0.2, 0.4, 0.4]
+OTHER_RATING_P = [0.1, 0.2, 0.4, 0.2, 0.1]
+
+# Liczba użytkowników w jednym fragmencie ocen (jednostka pracy procesu)
+SHARD_USERS = 50_000
+
+# Rozmiar bloku (użytkownicy x filmy) przy dolosowaniu brakujących filmów bez zwracania
+FILL_BLOCK_ELEMENTS = 4_000_000
+
+# Stan generatora ocen w procesie (ustawiany raz przez _init_worker)
+_worker = {}
+
+
+def _rng(seed, *stream):
+    """Niezależny strumień losowy dla danego seeda (wynik nie zależy od kolejności wywołań)"""
+    return np.random.default_rng([seed, *stream])
 
-users_df = pd.DataFrame(users_data)
-
-# Generowanie ocen (ratings)
-# Każdy użytkownik ocenia losową liczbę filmów (5-20)
-ratings_data = []
-
-for user_id in range(1, 101):
-    # Losowa liczba filmów które użytkownik obejrzał
-    num_movies = np.random.randint(8, 25)
-    
-    # Losowe filmy które użytkownik obejrzał
-    watched_movies = np.random.choice(movies_df['movie_id'].values, num_movies, replace=False)
-    
-    # Preferencje użytkownika - niektórzy wolą określone gatunki
-    user_preferences = {}
-    preferred_genres = np.random.choice(movies_df['genre'].unique(), np.random.randint(1, 4), replace=False)
-    
-    for movie_id in watched_movies:
-        movie_genre = movies_df[movies_df['movie_id'] == movie_id]['genre'].iloc[0]
-        
-        # Jeśli film z preferowanego gatunku, wyższa szansa na dobrą ocenę
-        if movie_genre in preferred_genres:
-            rating = np.random.choice([3, 4, 5], p=[0.2, 0.4, 0.4])
-        else:
-            rating = np.random.choice([1, 2, 3, 4, 5], p=[0.1, 0.2, 0.4, 0.2, 0.1])
-        
-        # Timestamp - losowa data z ostatnich 2 lat
-        timestamp = datetime.now() - timedelta(days=np.random.randint(1, 730))
-        
-        ratings_data.append({
-            'user_id': user_id,
-            'movie_id': movie_id,
-            'rating': rating,
-            'timestamp': timestamp
+
+def generate_movies(n_movies=len(movies_data), seed=42):
+    """Tworzy katalog filmów: lista przykładowa + syntetyczne filmy do n_movies"""
+    rng = _rng(seed, 0)
+    movies_df = pd.DataFrame(movies_data[:n_movies])
+    n_extra = n_movies - len(movies_df)
+    if n_extra > 0:
+        extra = pd.DataFrame({
+            "title": [f"Film {i + 1}" for i in range(len(movies_df), n_movies)],
+            "genre": np.array(GENRES)[rng.integers(len(GENRES), size=n_extra)],
+            "year": rng.integers(1940, 2025, size=n_extra),
+            "director": np.array(DIRECTORS)[rng.integers(len(DIRECTORS), size=n_extra)],
         })
+        movies_df = pd.concat([movies_df, extra], ignore_index=True)
+    movies_df['movie_id'] = np.arange(1, len(movies_df) + 1)
+    return movies_df
+
+
+def generate_users(n_users=100, seed=42):
+    """Generowanie użytkowników"""
+    rng = _rng(seed, 1)
+    return pd.DataFrame({
+        'user_id': np.arange(1, n_users + 1),
+        'age': rng.integers(18, 65, size=n_users),
+        'gender': np.array(['M', 'F', 'Other'])[rng.integers(3, size=n_users)],
+    })
+
+
+def popularity_weights(n_movies, skew=1.0, seed=42):
+    """Popularność filmów wg rozkładu Zipfa: waga 1 / ranga^skew, rangi losowo przypisane filmom
+
+    skew=0 oznacza równą popularność wszystkich filmów.
+    """
+    ranks = _rng(seed, 2).permutation(n_movies) + 1
+    weights = 1.0 / ranks ** skew
+    return weights / weights.sum()
+
+
+def _sample_distinct(rng, counts, cdf, max_rounds=20):
+    """Losuje dla każdego użytkownika counts[i] różnych filmów z rozkładu o dystrybuancie cdf
+
+    Filmy losowane są ze zwracaniem (w nadmiarze), po czym powtórzenia są
+    usuwane; brakujące pozycje dolosowywane są w kolejnych rundach. Przy
+    silnej skośności część użytkowników może po max_rounds nadal mieć za
+    mało filmów - ich brakujące pozycje losowane są bez zwracania spośród
+    jeszcze nieocenionych filmów (ten sam rozkład, bez powtórzeń).
+    Zwraca pary (numer użytkownika, indeks filmu) pogrupowane wg użytkownika.
+    """
+    n_movies = len(cdf)
+    users = np.empty(0, dtype=np.int64)
+    movies = np.empty(0, dtype=np.int64)
+    missing = counts.astype(np.int64)
+
+    for _ in range(max_rounds):
+        pending = np.flatnonzero(missing)
+        if len(pending) == 0:
+            break
+        draw_users = np.repeat(pending, 2 * missing[pending])
+        draw_movies = np.searchsorted(cdf, rng.random(len(draw_users)), side='right')
+        users = np.concatenate([users, draw_users])
+        movies = np.concatenate([movies, draw_movies])
+
+        # Usunięcie powtórzeń z zachowaniem kolejności losowania
+        _, first = np.unique(users * n_movies + movies, return_index=True)
+        first.sort()
+        order = np.argsort(users[first], kind='stable')
+        users, movies = users[first][order], movies[first][order]
+
+        # Obcięcie do counts filmów na użytkownika
+        per_user = np.bincount(users, minlength=len(counts))
+        ranks = np.arange(len(users)) - np.repeat(np.cumsum(per_user) - per_user, per_user)
+        keep = ranks < counts[users]
+        users, movies = users[keep], movies[keep]
+        missing = counts - np.bincount(users, minlength=len(counts))
+
+    # Dolosowanie bez zwracania: klucz filmu to E / p (E ~ Exp(1)), wybierane są
+    # najmniejsze klucze nieocenionych filmów - rozkład jak kolejne losowania
+    # z p bez powtórzeń, bez pętli po użytkownikach
+    pending = np.flatnonzero(missing)
+    if len(pending):
+        probabilities = np.diff(cdf, prepend=0.0)
+        user_parts, movie_parts = [users], [movies]
+        block_size = max(1, FILL_BLOCK_ELEMENTS // n_movies)
+        for start in range(0, len(pending), block_size):
+            block = pending[start:start + block_size]
+            keys = rng.exponential(size=(len(block), n_movies)) / probabilities
+            rated = np.isin(users, block)
+            keys[np.searchsorted(block, users[rated]), movies[rated]] = np.inf
+            n_extra = np.minimum(missing[block], n_movies - (counts[block] - missing[block]))
+            take = np.arange(n_movies) < n_extra[:, None]
+            user_parts.append(np.broadcast_to(block[:, None], take.shape)[take])
+            movie_parts.append(np.argsort(keys, axis=1, kind='stable')[take])
+        users = np.concatenate(user_parts)
+        movies = np.concatenate(movie_parts)
+        order = np.argsort(users, kind='stable')
+        users, movies = users[order], movies[order]
+
+    return users, movies
+
+
+def _init_worker(context):
+    """Ustawia wspólne dane generatora (dystrybuanta popularności, gatunki filmów itd.)"""
+    _worker.update(context)
+
+
+def _generate_shard(shard):
+    """Generuje oceny użytkowników jednego fragmentu (wszystko wektorowo)
+
+    Każdy fragment ma własny strumień losowy, więc wynik nie zależy od
+    liczby procesów. Przy zapisie do CSV fragment jest od razu
+    formatowany w procesie roboczym.
+    """
+    ctx = _worker
+    rng = _rng(ctx['seed'], 3, shard)
+    first_user = shard * ctx['shard_users']
+    n_users = min(ctx['shard_users'], ctx['n_users'] - first_user)
+    n_movies = len(ctx['cdf'])
+
+    # Liczba obejrzanych filmów i preferowane gatunki (1-3) każdego użytkownika
+    max_movies = min(ctx['max_movies'], n_movies)
+    min_movies = min(ctx['min_movies'], max_movies - 1)
+    counts = rng.integers(min_movies, max_movies, size=n_users)
+    n_genres = ctx['n_genres']
+    n_preferred = rng.integers(1, min(4, n_genres + 1), size=n_users)
+    genre_ranks = rng.random((n_users, n_genres)).argsort(axis=1).argsort(axis=1)
+    preferred = genre_ranks < n_preferred[:, None]
+
+    users, movies = _sample_distinct(rng, counts, ctx['cdf'])
+
+    # Jeśli film z preferowanego gatunku, wyższa szansa na dobrą ocenę
+    is_preferred = preferred[users, ctx['movie_genres'][movies]]
+    rating_cdf = np.cumsum([OTHER_RATING_P, PREFERRED_RATING_P], axis=1)[is_preferred.astype(int)]
+    ratings = 1 + (rng.random(len(users))[:, None] > rating_cdf[:, :-1]).sum(axis=1)
+
+    # Timestamp - losowa data z ostatnich 2 lat
+    days = rng.integers(1, 730, size=len(users))
+    timestamps = ctx['end_time'] - days * np.timedelta64(1, 'D')
+
+    ratings_df = pd.DataFrame({
+        'user_id': (first_user + users + 1).astype(np.int32),
+        'movie_id': (movies + 1).astype(np.int32),
+        'rating': ratings.astype(np.int8),
+        'timestamp': timestamps,
+    })
+    if ctx['as_csv']:
+        return ratings_df.to_csv(index=False, header=False).encode()
+    return ratings_df
+
+
+def _map_shards(context, n_shards, n_jobs=1):
+    """Zwraca kolejne fragmenty (w kolejności), liczone w bieżącym procesie lub w puli procesów
+
+    W puli w toku jest najwyżej 2 * n_jobs fragmentów, więc pamięć nie
+    rośnie z rozmiarem danych.
+    """
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+    if n_jobs == 1 or n_shards <= 1:
+        _init_worker(context)
+        for shard in range(n_shards):
+            yield _generate_shard(shard)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(context,)) as pool:
+        pending = deque()
+        for shard in range(n_shards):
+            pending.append(pool.submit(_generate_shard, shard))
+            if len(pending) >= 2 * n_jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_ratings(movies_df, n_users=100, min_movies=8, max_movies=25, popularity_skew=1.0,
+                 seed=42, end_time=None, n_jobs=1, as_csv=False, shard_users=SHARD_USERS):
+    """Generuje oceny fragmentami po shard_users użytkowników
+
+    Każdy użytkownik ocenia losową liczbę różnych filmów (min_movies -
+    max_movies), wybieranych wg popularności Zipfa. Wynik zależy tylko od
+    seeda i end_time (domyślnie teraz), nie od n_jobs.
+    """
+    genres, movie_genres = np.unique(movies_df['genre'].to_numpy(), return_inverse=True)
+    if end_time is None:
+        end_time = np.datetime64('now', 's')
+    context = {
+        'seed': seed,
+        'n_users': n_users,
+        'shard_users': shard_users,
+        'min_movies': min_movies,
+        'max_movies': max_movies,
+        'cdf': np.cumsum(popularity_weights(len(movies_df), popularity_skew, seed)),
+        'movie_genres': movie_genres,
+        'n_genres': len(genres),
+        'end_time': np.datetime64(end_time, 's'),
+        'as_csv': as_csv,
+    }
+    context['cdf'][-1] = 1.0
+    n_shards = -(-n_users // shard_users)
+    return _map_shards(context, n_shards, n_jobs)
+
+
+def generate_ratings(movies_df, n_users=100, **kwargs):
+    """Generowanie ocen (ratings) jako jeden DataFrame - patrz iter_ratings"""
+    shards = list(iter_ratings(movies_df, n_users, **kwargs))
+    if not shards:
+        return pd.DataFrame(columns=['user_id', 'movie_id', 'rating', 'timestamp'])
+    return pd.concat(shards, ignore_index=True)
+
+
+def write_ratings(path, movies_df, n_users=100, **kwargs):
+    """Generuje oceny i zapisuje je fragmentami do CSV lub Parquet (wg rozszerzenia pliku)
+
+    Cały zbiór ocen nigdy nie jest trzymany w pamięci. Zwraca liczbę ocen.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    n_ratings = 0
+
+    if extension == '.csv':
+        with open(path, 'wb') as f:
+            f.write(b"user_id,movie_id,rating,timestamp\n")
+            for chunk in iter_ratings(movies_df, n_users, as_csv=True, **kwargs):
+                f.write(chunk)
+                n_ratings += chunk.count(b"\n")
+
+    elif extension == '.parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Zapis plikow Parquet wymaga pakietu pyarrow")
+        writer = None
+        try:
+            for chunk in iter_ratings(movies_df, n_users, **kwargs):
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                n_ratings += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    else:
+        raise ValueError(f"Nieobslugiwany format pliku ocen: {path}")
+
+    return n_ratings
+
+
+def generate_dataset(n_users=100, n_movies=len(movies_data), seed=42, **rating_kwargs):
+    """Generuje komplet danych (filmy, użytkownicy, oceny) z ustalonym seedem"""
+    movies_df = generate_movies(n_movies, seed)
+    users_df = generate_users(n_users, seed)
+    ratings_df = generate_ratings(movies_df, n_users, seed=seed, **rating_kwargs)
+    return movies_df, users_df, ratings_df
+
+
+def save_dataset(movies_df, users_df, ratings_df, output_dir='.'):
+    """Zapisywanie do plików CSV"""
+    os.makedirs(output_dir, exist_ok=True)
+    movies_df.to_csv(os.path.join(output_dir, 'movies.csv'), index=False)
+    users_df.to_csv(os.path.join(output_dir, 'users.csv'), index=False)
+    ratings_df.to_csv(os.path.join(output_dir, 'ratings.csv'), index=False)
+
+
+def write_dataset(output_dir='.', n_users=100, n_movies=len(movies_data), seed=42,
+                  ratings_format='csv', **rating_kwargs):
+    """Generuje dane i zapisuje je do katalogu, oceny strumieniowo (dla dużych zbiorów)
+
+    Zwraca (filmy, użytkownicy, liczba ocen).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    movies_df = generate_movies(n_movies, seed)
+    users_df = generate_users(n_users, seed)
+    movies_df.to_csv(os.path.join(output_dir, 'movies.csv'), index=False)
+    users_df.to_csv(os.path.join(output_dir, 'users.csv'), index=False)
+    n_ratings = write_ratings(
+        os.path.join(output_dir, f'ratings.{ratings_format}'), movies_df, n_users, seed=seed, **rating_kwargs
+    )
+    return movies_df, users_df, n_ratings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generator przykladowych danych o filmach")
+    parser.add_argument('--users', type=int, default=100, help="liczba uzytkownikow")
+    parser.add_argument('--movies', type=int, default=len(movies_data), help="liczba filmow")
+    parser.add_argument('--min-ratings', type=int, default=8, help="min. liczba ocen uzytkownika")
+    parser.add_argument('--max-ratings', type=int, default=25, help="max. liczba ocen uzytkownika")
+    parser.add_argument('--skew', type=float, default=1.0, help="wykladnik Zipfa popularnosci filmow (0 = rowna)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end-date', help="data najnowszej oceny (domyslnie teraz; ustaw dla w pelni powtarzalnych danych)")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help="format pliku ocen")
+    parser.add_argument('--jobs', type=int, default=1, help="liczba procesow (-1 = wszystkie rdzenie)")
+    parser.add_argument('--output-dir', default='.', help="katalog na pliki")
+    args = parser.parse_args()
+
+    movies_df, users_df, n_ratings = write_dataset(
+        args.output_dir, args.users, args.movies, args.seed, args.format,
+        min_movies=args.min_ratings, max_movies=args.max_ratings, popularity_skew=args.skew,
+        end_time=args.end_date, n_jobs=args.jobs
+    )
+
+    print("Wygenerowano przykladowe dane:")
+    print(f"Filmy: {len(movies_df)} pozycji")
+    print(f"Uzytkownicy: {len(users_df)} osob")
+    print(f"Oceny: {n_ratings} ocen")
+    print("\nPliki zapisane:")
+    print("- movies.csv")
+    print("- users.csv")
+    print(f"- ratings.{args.format}")
+
 
-ratings_df = pd.DataFrame(ratings_data)
-
-# Zapisywanie do plików CSV
-movies_df.to_csv('movies.csv', index=False)
-users_df.to_csv('users.csv', index=False)
-ratings_df.to_csv('ratings.csv', index=False)
-
-print("Wygenerowano przykladowe dane:")
-print(f"Filmy: {len(movies_df)} pozycji")
-print(f"Uzytkownicy: {len(users_df)} osob")
-print(f"Oceny: {len(ratings_df)} ocen")
-print("\nPliki zapisane:")
-print("- movies.csv")
-print("- users.csv") 
-print("- ratings.csv")
-
-# Podstawowe statystyki
-print(f"\nStatystyki:")
-print(f"Srednia ocena: {ratings_df['rating'].mean():.2f}")
-print(f"Najczesciej oceniany gatunek: {movies_df.merge(ratings_df, on='movie_id')['genre'].mode().iloc[0]}")
-print(f"Rozklad ocen:")
-print(ratings_df['rating'].value_counts().sort_index())
+if __name__ == "__main__":
+    main()
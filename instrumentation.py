@@ -0,0 +1,241 @@
+import functools
+import json
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class Instrumentation:
+    """Liczniki i czasy etapów (trenowanie, wywołania rekomendacji) w pamięci procesu
+
+    Każdy pomiar trafia też do dołączonych ujść (add_sink), np. LogSink.
+    Przy track_memory=True etapy oznaczone memory=True zapisują szczyt
+    pamięci zaalokowanej w trakcie (tracemalloc) - dla etapów trenowania,
+    bo tracemalloc spowalnia alokacje całego procesu.
+    """
+
+    def __init__(self, enabled=True, track_memory=False):
+        self.enabled = enabled
+        self.track_memory = track_memory
+        self.timers = {}
+        self.counters = Counter()
+        self.memory_peaks = {}
+        self.sinks = []
+        self._lock = threading.Lock()
+        self._memory_stack = threading.local()
+
+    def add_sink(self, sink):
+        """Dodaje ujście - wywoływane z (nazwa, czas w s, szczyt pamięci w B lub None)"""
+        self.sinks.append(sink)
+
+    def count(self, name, value=1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] += value
+
+    def record(self, name, seconds, peak_bytes=None):
+        """Zapisuje pomiar etapu: liczba wywołań, czas łączny i maksymalny, szczyt pamięci"""
+        with self._lock:
+            calls, total, longest = self.timers.get(name, (0, 0.0, 0.0))
+            self.timers[name] = (calls + 1, total + seconds, max(longest, seconds))
+            if peak_bytes is not None:
+                self.memory_peaks[name] = max(self.memory_peaks.get(name, 0), peak_bytes)
+        for sink in self.sinks:
+            sink(name, seconds, peak_bytes)
+
+    def _start_memory(self):
+        stack = self._memory_stack.__dict__.setdefault('peaks', [])
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif stack:
+            stack[-1] = max(stack[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        stack.append(0)
+
+    def _stop_memory(self):
+        stack = self._memory_stack.peaks
+        peak = max(stack.pop(), tracemalloc.get_traced_memory()[1])
+        if stack:
+            # Szczyt etapu zagnieżdżonego jest też szczytem etapu zewnętrznego
+            stack[-1] = max(stack[-1], peak)
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.stop()
+        return peak
+
+    def timer(self, name, memory=False):
+        """Kontekst mierzący czas (i opcjonalnie pamięć) bloku kodu"""
+        return _Timer(self, name, memory and self.track_memory)
+
+    def timed(self, name, memory=False):
+        """Dekorator mierzący każde wywołanie funkcji jako etap name"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.timer(name, memory):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        with self._lock:
+            self.timers.clear()
+            self.counters.clear()
+            self.memory_peaks.clear()
+
+    def snapshot(self):
+        """Wszystkie pomiary jako słownik (do JSON)"""
+        with self._lock:
+            return {
+                'timers': {
+                    name: {'calls': calls, 'total_seconds': total, 'max_seconds': longest,
+                           'mean_seconds': total / calls}
+                    for name, (calls, total, longest) in sorted(self.timers.items())
+                },
+                'counters': dict(sorted(self.counters.items())),
+                'memory_peak_bytes': dict(sorted(self.memory_peaks.items())),
+                'peak_rss_bytes': peak_rss_bytes(),
+            }
+
+    def dump_json(self, path):
+        """Zapisuje snapshot() do pliku JSON"""
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def to_prometheus(self, prefix='recommender', gauges=None):
+        """Pomiary w formacie tekstowym Prometheusa (gauges - dodatkowe wartości nazwa -> liczba)"""
+        snapshot = self.snapshot()
+        lines = [
+            f"# TYPE {prefix}_stage_calls_total counter",
+            f"# TYPE {prefix}_stage_seconds_total counter",
+            f"# TYPE {prefix}_stage_seconds_max gauge",
+        ]
+        for name, values in snapshot['timers'].items():
+            label = f'{{stage="{name}"}}'
+            lines.append(f"{prefix}_stage_calls_total{label} {values['calls']}")
+            lines.append(f"{prefix}_stage_seconds_total{label} {values['total_seconds']:.6f}")
+            lines.append(f"{prefix}_stage_seconds_max{label} {values['max_seconds']:.6f}")
+        if snapshot['memory_peak_bytes']:
+            lines.append(f"# TYPE {prefix}_stage_memory_peak_bytes gauge")
+        for name, peak in snapshot['memory_peak_bytes'].items():
+            lines.append(f'{prefix}_stage_memory_peak_bytes{{stage="{name}"}} {peak}')
+        if snapshot['counters']:
+            lines.append(f"# TYPE {prefix}_events_total counter")
+        for name, value in snapshot['counters'].items():
+            lines.append(f'{prefix}_events_total{{event="{name}"}} {value}')
+        for name, value in (gauges or {}).items():
+            lines.append(f"{prefix}_{name} {value}")
+        if snapshot['peak_rss_bytes'] is not None:
+            lines.append(f"process_peak_rss_bytes {snapshot['peak_rss_bytes']}")
+        return "\n".join(lines) + "\n"
+
+
+class _Timer:
+    def __init__(self, instrumentation, name, memory):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.memory = memory
+
+    def __enter__(self):
+        if self.memory:
+            self.instrumentation._start_memory()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        peak = self.instrumentation._stop_memory() if self.memory else None
+        if exc_type is not None:
+            self.instrumentation.count(f"{self.name}.errors")
+        self.instrumentation.record(self.name, seconds, peak)
+        return False
+
+
+class LogSink:
+    """Ujście zapisujące każdy pomiar do loggera"""
+
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger('recommender.metrics')
+        self.level = level
+
+    def __call__(self, name, seconds, peak_bytes):
+        if peak_bytes is None:
+            self.logger.log(self.level, "%s: %.2f ms", name, seconds * 1000)
+        else:
+            self.logger.log(self.level, "%s: %.2f ms, szczyt pamieci %.1f MB", name, seconds * 1000, peak_bytes / 2 ** 20)
+
+
+def peak_rss_bytes():
+    """Szczytowe zużycie pamięci procesu (RSS) w bajtach; None, gdy niedostępne"""
+    if resource is None:
+        return None
+    # Linux zwraca kB, macOS bajty
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class SamplingProfiler:
+    """Próbkujący profiler stosów wszystkich wątków (dane do flame graph)
+
+    Włączony - osobny wątek co interval sekund zapisuje stosy wywołań;
+    wyłączony nie kosztuje nic. collapsed() zwraca format "f1;f2;f3 liczba"
+    (flamegraph.pl, speedscope).
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = Counter()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """Zebrane próbki w formacie collapsed stacks"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            f.write(self.collapsed())
+
+
+# Wspólny rejestr pomiarów procesu
+metrics = Instrumentation()
+timed = metrics.timed
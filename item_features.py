@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from similarity import neighbors_to_csr, top_k_cosine_neighbors
+
+# Szerokość przedziału lat produkcji (w latach) jako jednej cechy
+YEAR_BUCKET = 10
+
+# Liczba zapamiętywanych najbardziej podobnych filmów na film
+METADATA_TOP_K = 50
+
+
+def item_feature_matrix(movies_df, year_bucket=YEAR_BUCKET, weights=None):
+    """Rzadka macierz cech filmów (wiersze movies_df x cechy)
+
+    Cechy to one-hot gatunku, reżysera i przedziału lat (year_bucket lat);
+    weights to opcjonalne wagi grup cech, np. {'director': 2.0}. Brakujące
+    wartości nie dają cechy. Zwraca (macierz CSR, nazwy cech).
+    """
+    weights = weights or {}
+    years = movies_df['year'] // year_bucket * year_bucket
+    columns = {'genre': movies_df['genre'], 'director': movies_df['director'], 'year': years}
+
+    blocks, names = [], []
+    for group, values in columns.items():
+        codes, categories = pd.factorize(values, sort=True)
+        present = np.flatnonzero(codes >= 0)
+        blocks.append(sparse.csr_matrix(
+            (np.full(len(present), weights.get(group, 1.0)), (present, codes[present])),
+            shape=(len(movies_df), len(categories))
+        ))
+        if group == 'year':
+            names.extend(f"year={int(start)}-{int(start) + year_bucket - 1}" for start in categories)
+        else:
+            names.extend(f"{group}={category}" for category in categories)
+    return sparse.hstack(blocks, format='csr'), names
+
+
+def metadata_similarity(features, top_k=METADATA_TOP_K, n_jobs=1):
+    """Podobieństwo cosinusowe filmów po cechach - top_k sąsiadów na film (CSR, bez przekątnej)
+
+    Filmy o tych samych cechach (gatunek, reżyser, przedział lat) mają te
+    same listy sąsiadów, więc podobieństwa liczone są raz na kombinację cech.
+    """
+    indices, scores = top_k_cosine_neighbors(features, top_k, n_jobs=n_jobs, unique_rows=True)
+    return neighbors_to_csr(indices, scores, features.shape[0])
@@ -1,28 +1,255 @@
 import pandas as pd
 import numpy as np
+from scipy import sparse
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.decomposition import TruncatedSVD
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error
+from dataclasses import dataclass, field
+import copy
+import itertools
+import json
+import os
+import shutil
+from ann_index import IVFIndex, recall_at_k, TARGET_RECALL
+from factorization import ALSModel
+from item_features import item_feature_matrix, metadata_similarity, METADATA_TOP_K
+from quantization import QuantizedVectors, resize_rows
+from candidate_filters import BitmapIndex, MovieFilter
+from instrumentation import metrics, timed
+from ratings_io import read_ratings, to_epoch_us, RATINGS_CHUNKSIZE
+from similarity import (
+    keep_top_k_per_row, top_k_cosine_neighbors, top_k_cosine_rows, cosine_rows,
+    neighbors_to_csr, replace_rows, resize_csr,
+)
 import warnings
 warnings.filterwarnings('ignore')
 
+# Nazwy metod rekomendacji
+COLLABORATIVE = "Collaborative Filtering (Users)"
+CONTENT = "Content-based (Movie Similarity)"
+SVD = "SVD Matrix Factorization"
+ALS = "ALS Matrix Factorization"
+HYBRID = "Hybrid (Rank Fusion)"
+METADATA = "Content-based (Movie Metadata)"
+METHOD_NAMES = {'collaborative': COLLABORATIVE, 'content': CONTENT, 'svd': SVD, 'als': ALS}
+
+# Domyślne wagi metod w liście hybrydowej i stała wygładzająca fuzji rang
+HYBRID_WEIGHTS = {'collaborative': 1.0, 'content': 1.0, 'svd': 1.0, 'als': 1.0}
+RRF_K = 60
+
+# Ocena, od której film jest "wysoko oceniony" (podstawa rekomendacji content-based)
+HIGH_RATING = 4
+
+# Liczba najlepszych kandydatów z czynników int8 przeliczanych dokładnie (float32) na użytkownika
+RERANK_CANDIDATES = 100
+
+# Wersja formatu zapisanych artefaktów modelu (save/load)
+MODEL_FORMAT_VERSION = 7
+
+# Kolejne wersje stanu modelu w procesie (zmieniają się przy trenowaniu,
+# aktualizacji i wczytaniu - np. do unieważniania cache rekomendacji)
+_model_versions = itertools.count(1)
+
+# Format wyników rekomendacji wsadowych
+RECOMMENDATION_DTYPE = np.dtype([
+    ('user_id', np.int64),
+    ('movie_id', np.int64),
+    ('score', np.float64),
+])
+
+
+@dataclass(frozen=True)
+class Recommendation:
+    """Pojedynczy rekomendowany film z metadanymi"""
+    __slots__ = ('movie_id', 'title', 'year', 'genre', 'director', 'score')
+    movie_id: int
+    title: str
+    year: int
+    genre: str
+    director: str
+    score: float
+    
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+    
+    def with_score(self, score):
+        return Recommendation(self.movie_id, self.title, self.year, self.genre, self.director, float(score))
+
+    def __reduce__(self):
+        # Zamrożona klasa ze __slots__ - pickle (np. wyniki z procesów shardów) przez konstruktor
+        return Recommendation, tuple(getattr(self, name) for name in self.__slots__)
+
+
+@dataclass
+class RecommendationList:
+    """Wynik rekomendacji dla użytkownika; message opisuje brak wyników"""
+    method: str
+    user_id: int
+    items: list = field(default_factory=list)
+    message: str = None
+    
+    def __iter__(self):
+        return iter(self.items)
+    
+    def __len__(self):
+        return len(self.items)
+    
+    def __str__(self):
+        return format_recommendations(self)
+    
+    def to_dict(self):
+        return {
+            'method': self.method,
+            'user_id': self.user_id,
+            'recommendations': [item.to_dict() for item in self.items],
+            'message': self.message,
+        }
+
+
+@dataclass
+class HybridRecommendations:
+    """Listy top-N poszczególnych metod i lista połączona fuzją rang"""
+    user_id: int
+    methods: dict = field(default_factory=dict)
+    blended: RecommendationList = None
+    
+    def __str__(self):
+        return "".join(str(result) for result in [*self.methods.values(), self.blended])
+    
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'methods': {method: result.to_dict() for method, result in self.methods.items()},
+            'blended': self.blended.to_dict(),
+        }
+
+
+def format_recommendations(result):
+    """Formatuje rekomendacje jako tekst z tytułami filmów"""
+    if result.message is not None:
+        return result.message
+    
+    text = f"\nRekomendacje ({result.method}):\n"
+    text += "=" * 50 + "\n"
+    
+    for i, item in enumerate(result.items, 1):
+        text += f"{i}. {item.title} ({item.year})\n"
+        text += f"   Gatunek: {item.genre} | Reżyser: {item.director}\n"
+        text += f"   Przewidywana ocena: {item.score:.2f}\n\n"
+    
+    return text
+
+
+def _top_n_indices(scores, n):
+    """Indeksy n najwyższych wyników (malejąco), z pominięciem wartości -inf
+
+    Używa argpartition zamiast pełnego sortowania; przy remisach zachowuje
+    kolejność rosnących indeksów (tak jak stabilne sortowanie).
+    """
+    candidates = np.flatnonzero(np.isfinite(scores))
+    if n <= 0:
+        return candidates[:0]
+    if n < len(candidates):
+        part = np.argpartition(-scores[candidates], n - 1)[:n]
+        threshold = scores[candidates[part]].min()
+        candidates = candidates[scores[candidates] >= threshold]
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order[:n]]
+
+
+def _row_entries(matrix, rows):
+    """Pozycje wartości wierszy rows macierzy CSR (w indices/data) i numer wiersza każdej z nich na liście rows"""
+    starts = matrix.indptr[rows]
+    lengths = matrix.indptr[np.asarray(rows) + 1] - starts
+    owner = np.repeat(np.arange(len(lengths)), lengths)
+    positions = np.arange(lengths.sum()) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return positions, owner
+
+
+def _scored_items(movies, movie_idx, scores):
+    """Rekomendacje z wynikami dla kolumn movie_idx; pomija filmy bez metadanych (None w movies)"""
+    return [movies[idx].with_score(score) for idx, score in zip(movie_idx, scores) if movies[idx] is not None]
+
+
+def _save_array(path, name, array, manifest):
+    """Zapisuje tablicę jako .npy (do otwarcia przez np.load(mmap_mode='r'))"""
+    array = np.ascontiguousarray(array)
+    np.save(os.path.join(path, f"{name}.npy"), array)
+    manifest['arrays'][name] = {'shape': list(array.shape), 'dtype': array.dtype.str}
+
+
+def _load_array(path, name, mmap_mode):
+    return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+
 class MovieRecommendationSystem:
+    # Metody obsługiwane przez score_block / recommend_batch
+    SCORING_METHODS = ('collaborative', 'content', 'svd', 'als')
+    
+    # Macierze rzadkie zapisywane przez save() jako trójki data/indices/indptr
+    _SPARSE_ARTIFACTS = (
+        'user_movie_matrix', 'rated_matrix', 'movie_user_matrix', 'high_rated_matrix',
+        'user_similarity', 'movie_similarity', 'metadata_similarity',
+    )
+    
+    # Indeksy bitmap filtrów zapisywane przez save() (tablica bitmap + klucze w manifeście)
+    _BITMAP_ARTIFACTS = ('filter_index', 'metadata_filter_index')
+    
+
     def __init__(self):
         self.movies_df = None
         self.users_df = None
         self.ratings_df = None
         self.user_movie_matrix = None
+        self.rated_matrix = None
+        self.movie_user_matrix = None
+        self.high_rated_matrix = None
+        self.high_rated_counts = None
+        self.user_index = None
+        self.movie_index = None
+        self.movie_rows = None
+        self.user_rows = None
+        # Metadane filmów w kolejności kolumn macierzy ocen (budowane przy pierwszej rekomendacji)
+        self.movie_items = None
+        # Cechy filmów z metadanych (wiersze movies_df) i podobieństwo filmów po tych cechach
+        self.item_features = None
+        self.feature_names = None
+        self.metadata_similarity = None
+        # Bitmapy filtrów kandydatów: kolumny macierzy ocen i wiersze movies_df (rekomendacje z metadanych)
+        self.filter_index = None
+        self.metadata_filter_index = None
+        self.rating_order = None
+        self.rating_offsets = None
+        self.rating_movie_rows = None
         self.svd_model = None
+        self.user_factors = None
+        self.ann_index = None
+        self.als_model = None
         self.user_similarity = None
         self.movie_similarity = None
+        self.similarity_top_k = None
+        self.n_jobs = 1
+        self.model_version = 0
+        self.fitted_at = None
+        # Stan aktualizacji przyrostowych (add_ratings)
+        self.updated_users = set()
+        self.ratings_at_fit = 0
+        self.ratings_since_fit = 0
+        self.refit_scheduled = False
         
-    def load_data(self):
-        """Ładuje dane z plików CSV"""
+    @timed('train.load_data', memory=True)
+    def load_data(self, data_dir='.', ratings_path=None, chunksize=RATINGS_CHUNKSIZE):
+        """Ładuje dane z plików CSV z katalogu data_dir
+
+        Oceny są czytane strumieniowo fragmentami po chunksize wierszy, od razu
+        w zwartych typach (id int32, ocena int8/float32, timestamp jako
+        mikrosekundy od epoki). ratings_path może też wskazywać plik .parquet/.feather/.npy.
+        """
         try:
-            self.movies_df = pd.read_csv('movies.csv')
-            self.users_df = pd.read_csv('users.csv')
-            self.ratings_df = pd.read_csv('ratings.csv')
+            self.movies_df = pd.read_csv(os.path.join(data_dir, 'movies.csv'))
+            self.users_df = pd.read_csv(os.path.join(data_dir, 'users.csv'))
+            self.ratings_df = read_ratings(ratings_path or os.path.join(data_dir, 'ratings.csv'), chunksize)
+            self.create_lookups()
+            self.create_metadata_index()
             print("Dane zaladowane pomyslnie!")
             return True
         except FileNotFoundError as e:
@@ -30,222 +257,1064 @@ class MovieRecommendationSystem:
             print("Najpierw uruchom generate_movie_data.py")
             return False
     
+    def create_lookups(self):
+        """Tworzy mapy movie_id -> wiersz movies_df i user_id -> wiersz users_df"""
+        self.movie_rows = pd.Index(self.movies_df['movie_id'])
+        self.user_rows = pd.Index(self.users_df['user_id'])
+        self.movie_items = None
+        
+    @timed('train.metadata_index', memory=True)
+    def create_metadata_index(self, top_k=METADATA_TOP_K):
+        """Macierz cech filmów (gatunek, reżyser, przedział lat) i top_k najpodobniejszych filmów po cechach
+
+        Zależy tylko od movies_df, więc obejmuje też filmy bez żadnych ocen.
+        """
+        self.item_features, self.feature_names = item_feature_matrix(self.movies_df)
+        self.metadata_similarity = metadata_similarity(self.item_features, top_k)
+        self.metadata_filter_index = BitmapIndex.from_movies(self.movies_df, self.movies_df['movie_id'])
+        
+    @timed('train.filter_index', memory=True)
+    def create_filter_index(self):
+        """Bitmapy gatunków, reżyserów i przedziałów lat dla kolumn macierzy ocen (filtry MovieFilter)"""
+        self.filter_index = BitmapIndex.from_movies(self.movies_df, self.movie_index)
+        
+    @timed('train.rating_index', memory=True)
+    def create_rating_index(self):
+        """Indeks ocen użytkowników (jak w CSR): wiersze ratings_df pogrupowane wg użytkownika
+
+        Oceny użytkownika z wiersza i macierzy ocen to
+        rating_order[rating_offsets[i]:rating_offsets[i + 1]], od najnowszej.
+        rating_movie_rows to wiersze movies_df tych ocen (-1 = brak metadanych).
+        """
+        rows = self.user_index.get_indexer(self.ratings_df['user_id'])
+        timestamps = self.ratings_df['timestamp'].to_numpy()
+        self.rating_order = np.lexsort((-timestamps, rows))
+        counts = np.bincount(rows, minlength=len(self.user_index))
+        self.rating_offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.rating_movie_rows = self.movie_rows.get_indexer(self.ratings_df['movie_id'].to_numpy()[self.rating_order])
+        
+    @timed('train.user_movie_matrix', memory=True)
     def create_user_movie_matrix(self):
-        """Tworzy macierz użytkownik-film"""
-        self.user_movie_matrix = self.ratings_df.pivot(
-            index='user_id', 
-            columns='movie_id', 
-            values='rating'
-        ).fillna(0)
-        print(f"Macierz uzytkownik-film: {self.user_movie_matrix.shape}")
+        """Tworzy rzadką macierz użytkownik-film (CSR) wraz z mapami indeksów"""
+        user_ids = self.ratings_df['user_id'].to_numpy()
+        movie_ids = self.ratings_df['movie_id'].to_numpy()
         
-    def train_svd_model(self, n_components=20):
-        """Trenuje model SVD (Singular Value Decomposition)"""
-        print("Trenowanie modelu SVD...")
+        # Ciągłe indeksy: user_id -> wiersz, movie_id -> kolumna
+        self.user_index = pd.Index(np.unique(user_ids))
+        self.movie_index = pd.Index(np.unique(movie_ids))
+        self.movie_items = None
+        self.create_filter_index()
         
-        # Przygotowanie danych
-        X = self.user_movie_matrix.values
+        rows = np.searchsorted(self.user_index.to_numpy(), user_ids)
+        cols = np.searchsorted(self.movie_index.to_numpy(), movie_ids)
         
-        # Podział na zbiór treningowy i testowy
-        train_data = []
-        test_data = []
+        # Powtórzone oceny tej samej pary - obowiązuje ostatnia
+        keys = rows.astype(np.int64) * len(self.movie_index) + cols
+        _, last = np.unique(keys[::-1], return_index=True)
+        last = len(keys) - 1 - last
         
-        for i in range(len(self.ratings_df)):
-            if np.random.random() < 0.8:  # 80% dla treningu
-                train_data.append(self.ratings_df.iloc[i])
-            else:
-                test_data.append(self.ratings_df.iloc[i])
+        self._set_rating_matrix(sparse.csr_matrix(
+            (self.ratings_df['rating'].to_numpy(dtype=np.float32)[last], (rows[last], cols[last])),
+            shape=(len(self.user_index), len(self.movie_index))
+        ))
+        print(f"Macierz uzytkownik-film: {self.user_movie_matrix.shape}, "
+              f"ocen: {self.user_movie_matrix.nnz}")
+        
+    def _set_rating_matrix(self, matrix):
+        """Ustawia macierz ocen i macierze od niej pochodne"""
+        self.user_movie_matrix = matrix
+        self.user_movie_matrix.sort_indices()
+        # Macierz 0/1 "czy oceniono" - współdzieli strukturę z macierzą ocen
+        self.rated_matrix = sparse.csr_matrix(
+            (np.ones_like(self.user_movie_matrix.data),
+             self.user_movie_matrix.indices, self.user_movie_matrix.indptr),
+            shape=self.user_movie_matrix.shape
+        )
+        # Transpozycja w formacie CSR daje szybki dostęp do ocen danego filmu
+        self.movie_user_matrix = self.user_movie_matrix.T.tocsr()
+        self.movie_user_matrix.sort_indices()
+        self._compute_user_aggregates()
+        
+    def _compute_user_aggregates(self):
+        """Prelicza wysoko ocenione filmy użytkowników (macierz CSR i liczności wierszy)
+
+        Dzięki temu wynik content-based to jedno mnożenie wiersza tej macierzy
+        przez macierz podobieństwa filmów, bez filtrowania ocen przy zapytaniu.
+        """
+        matrix = self.user_movie_matrix
+        high = matrix.data >= HIGH_RATING
+        rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+        counts = np.bincount(rows[high], minlength=matrix.shape[0])
+        self.high_rated_counts = counts
+        self.high_rated_matrix = sparse.csr_matrix(
+            (matrix.data[high], matrix.indices[high], np.concatenate([[0], np.cumsum(counts)])),
+            shape=matrix.shape
+        )
+        
+    @timed('train.svd', memory=True)
+    def train_svd_model(self, n_components=20):
+        """Trenuje model SVD (Singular Value Decomposition)
+
+        Model jest trenowany na wszystkich ocenach z macierzy; jakość mierzy
+        moduł evaluation (trenowanie tylko na części treningowej).
+        """
+        print("Trenowanie modelu SVD...")
+        
+        # Przygotowanie danych (TruncatedSVD działa bezpośrednio na macierzy rzadkiej)
+        X = self.user_movie_matrix
         
         # Trenowanie modelu SVD
         self.svd_model = TruncatedSVD(n_components=n_components, random_state=42)
         self.svd_model.fit(X)
+        # Indeks ANN odpowiada poprzedniemu modelowi
+        self.ann_index = None
         
-        # Transformacja danych
-        user_factors = self.svd_model.transform(X)
-        movie_factors = self.svd_model.components_.T
-        
-        # Obliczanie predykcji dla zbioru testowego
-        if test_data:
-            predictions = []
-            actuals = []
-            
-            for rating in test_data:
-                user_idx = rating['user_id'] - 1
-                movie_idx = rating['movie_id'] - 1
-                
-                if user_idx < len(user_factors) and movie_idx < len(movie_factors):
-                    pred = np.dot(user_factors[user_idx], movie_factors[movie_idx])
-                    predictions.append(pred)
-                    actuals.append(rating['rating'])
-            
-            if predictions:
-                rmse = np.sqrt(mean_squared_error(actuals, predictions))
-                print(f"RMSE na zbiorze testowym: {rmse:.3f}")
+        # Czynniki filmów i użytkowników jako ciągłe tablice float32 (niezależnie od typu X);
+        # czynniki użytkowników są zapamiętywane
+        self.svd_model.components_ = np.ascontiguousarray(self.svd_model.components_, dtype=np.float32)
+        self.user_factors = np.ascontiguousarray(self.svd_model.transform(X), dtype=np.float32)
         
         print("Model SVD wytrenowany!")
         
-    def calculate_user_similarity(self):
-        """Oblicza podobieństwo między użytkownikami"""
+    def quantize_user_factors(self):
+        """Przechowuje czynniki SVD użytkowników w int8 ze skalą na wektor (ok. 4x mniej pamięci)
+
+        Wyniki SVD liczone są wtedy z czynników int8, a RERANK_CANDIDATES
+        najlepszych filmów każdego użytkownika przeliczane dokładnie z jego
+        ocen. Tryb zostaje zachowany przy refit, add_ratings i save/load.
+        """
+        if not isinstance(self.user_factors, QuantizedVectors):
+            self.user_factors = QuantizedVectors.from_float(self.user_factors)
+            self.model_version = next(_model_versions)
+        
+    @property
+    def factors_quantized(self):
+        return isinstance(self.user_factors, QuantizedVectors)
+        
+    @timed('train.als', memory=True)
+    def train_als_model(self, n_factors=20, regularization=0.1, n_iter=15, validation_size=0.1,
+                        n_jobs=None, random_state=42):
+        """Trenuje model ALS tylko na obserwowanych ocenach (bez wypełniania zerami)
+
+        Liczba iteracji wybierana jest wczesnym zatrzymaniem na losowej części
+        ocen (validation_size), po czym model jest trenowany na wszystkich
+        ocenach z tą liczbą iteracji. n_jobs to liczba wątków rozwiązujących
+        bloki (domyślnie jak w fit()).
+        """
+        print("Trenowanie modelu ALS...")
+        n_jobs = self.n_jobs if n_jobs is None else n_jobs
+        params = dict(n_factors=n_factors, regularization=regularization, n_jobs=n_jobs,
+                      random_state=random_state)
+        
+        if validation_size > 0:
+            ratings = self.user_movie_matrix.tocoo()
+            validation = np.random.default_rng(random_state).random(ratings.nnz) < validation_size
+            train = sparse.csr_matrix(
+                (ratings.data[~validation], (ratings.row[~validation], ratings.col[~validation])),
+                shape=ratings.shape
+            )
+            model = ALSModel(n_iter=n_iter, **params).fit(
+                train, (ratings.row[validation], ratings.col[validation], ratings.data[validation])
+            )
+            print(f"ALS: {model.best_iter} iteracji, RMSE walidacji: {model.validation_rmse:.4f}")
+            n_iter = model.best_iter
+        
+        self.als_model = ALSModel(n_iter=n_iter, **params).fit(self.user_movie_matrix)
+        print("Model ALS wytrenowany!")
+        
+    @timed('train.ann_index', memory=True)
+    def build_ann_index(self, n_lists=None, n_probe=None, target_recall=TARGET_RECALL, n_recommendations=10):
+        """Buduje indeks ANN (IVF) nad czynnikami filmów modelu SVD
+
+        Po zbudowaniu get_svd_recommendations przeszukuje tylko n_probe list
+        zamiast liczyć iloczyn z czynnikami wszystkich filmów. Domyślnie
+        n_probe jest dobierane tak, by recall@n_recommendations na próbce
+        użytkowników osiągnął target_recall.
+        """
+        print("Budowanie indeksu ANN...")
+        self.ann_index = IVFIndex(n_lists=n_lists, n_probe=n_probe).fit(self.svd_model.components_.T)
+        if n_probe is None:
+            queries, excludes = self._ann_queries()
+            self.ann_index.tune_n_probe(queries, n_recommendations, target_recall, excludes)
+        self.model_version = next(_model_versions)
+        print(f"Indeks ANN zbudowany ({len(self.ann_index.centroids)} list, n_probe {self.ann_index.n_probe})")
+        
+    def _ann_queries(self, sample_size=1000, random_state=42):
+        """Czynniki SVD losowych użytkowników i ich ocenione filmy (do pomiaru recall indeksu ANN)"""
+        rng = np.random.default_rng(random_state)
+        n_users = len(self.user_index)
+        user_idx = rng.choice(n_users, min(sample_size, n_users), replace=False)
+        
+        rated = self.rated_matrix[user_idx]
+        excludes = [rated.indices[rated.indptr[i]:rated.indptr[i + 1]] for i in range(len(user_idx))]
+        return self.user_factors[user_idx], excludes
+        
+    def evaluate_ann_recall(self, n_recommendations=10, n_probe=None, sample_size=1000, random_state=42):
+        """Recall@N rekomendacji SVD z indeksu ANN względem dokładnego przeszukania"""
+        queries, excludes = self._ann_queries(sample_size, random_state)
+        return recall_at_k(self.ann_index, queries, n_recommendations, n_probe, excludes)
+        
+    @timed('train.user_similarity', memory=True)
+    def calculate_user_similarity(self, top_k=None, block_size=1024, n_jobs=1):
+        """Oblicza podobieństwo między użytkownikami
+
+        Przy top_k zapamiętywanych jest tylko k najbardziej podobnych
+        użytkowników na wiersz (liczone blokami, bez pełnej macierzy N x N);
+        n_jobs > 1 rozdziela bloki między procesy.
+        """
         print("Obliczanie podobienstwa uzytkownikow...")
-        self.user_similarity = cosine_similarity(self.user_movie_matrix)
+        self.similarity_top_k = top_k
+        if top_k is None:
+            self.user_similarity = cosine_similarity(self.user_movie_matrix, dense_output=False)
+        else:
+            indices, scores = top_k_cosine_neighbors(self.user_movie_matrix, top_k, block_size, n_jobs)
+            self.user_similarity = neighbors_to_csr(indices, scores, len(self.user_index))
         print("Podobienstwo uzytkownikow obliczone!")
         
-    def calculate_movie_similarity(self):
-        """Oblicza podobieństwo między filmami"""
+    @timed('train.movie_similarity', memory=True)
+    def calculate_movie_similarity(self, top_k=None, block_size=1024, n_jobs=1):
+        """Oblicza podobieństwo między filmami (parametry jak w calculate_user_similarity)"""
         print("Obliczanie podobienstwa filmow...")
-        self.movie_similarity = cosine_similarity(self.user_movie_matrix.T)
+        self.similarity_top_k = top_k
+        if top_k is None:
+            self.movie_similarity = cosine_similarity(self.movie_user_matrix, dense_output=False)
+        else:
+            indices, scores = top_k_cosine_neighbors(self.movie_user_matrix, top_k, block_size, n_jobs)
+            self.movie_similarity = neighbors_to_csr(indices, scores, len(self.movie_index))
         print("Podobienstwo filmow obliczone!")
         
-    def get_user_recommendations_collaborative(self, user_id, n_recommendations=5):
-        """Rekomendacje oparte na collaborative filtering (użytkownicy)"""
-        if user_id not in self.user_movie_matrix.index:
-            return f"Uzytkownik {user_id} nie istnieje w bazie danych"
+    def _rated_mask(self, user_idx, filters=None):
+        """Maska (blok użytkowników x filmy) filmów już ocenionych przez użytkowników
+
+        Z filters (MovieFilter) maska obejmuje też filmy odrzucone przez filtr,
+        więc są pomijane przed wyborem top-N.
+        """
+        mask = self.rated_matrix[np.atleast_1d(user_idx)].toarray() > 0
+        excluded = self.filter_index.excluded(filters) if filters is not None else None
+        if excluded is not None:
+            mask |= excluded
+        return mask
+        
+    def _collaborative_scores(self, user_idx, n_neighbors=None, rated=None):
+        """Przewidywane oceny (collaborative) dla bloku użytkowników jednym mnożeniem macierzy
+
+        Zwraca tablicę (len(user_idx), liczba filmów); filmy ocenione przez
+        użytkownika lub bez ocen od podobnych użytkowników mają wartość -inf.
+        rated to opcjonalna, już policzona maska _rated_mask(user_idx).
+        """
+        user_idx = np.atleast_1d(user_idx)
+        similarity = self.user_similarity[user_idx]
+        
+        # Ograniczenie do k najbardziej podobnych innych użytkowników. Bez
+        # ograniczenia sam użytkownik nie jest usuwany: wnosi coś tylko do
+        # filmów, które ocenił, a te i tak są maskowane
+        if n_neighbors is not None:
+            similarity = similarity.tocoo()
+            not_self = similarity.col != user_idx[similarity.row]
+            similarity = sparse.csr_matrix(
+                (similarity.data[not_self], (similarity.row[not_self], similarity.col[not_self])),
+                shape=similarity.shape
+            )
+            similarity = keep_top_k_per_row(similarity, n_neighbors)
+        
+        weighted_sum = (similarity @ self.user_movie_matrix).toarray()
+        similarity_sum = (abs(similarity) @ self.rated_matrix).toarray()
+        
+        scores = np.full(weighted_sum.shape, -np.inf)
+        np.divide(weighted_sum, similarity_sum, out=scores, where=similarity_sum > 0)
+        scores[self._rated_mask(user_idx) if rated is None else rated] = -np.inf
+        return scores
+        
+    def _content_scores(self, user_idx, rated=None):
+        """Wyniki content-based dla bloku użytkowników (wysokie oceny x podobieństwo filmów)
+
+        Użytkownicy bez wysoko ocenionych filmów oraz filmy już ocenione
+        mają wartość -inf.
+        """
+        user_idx = np.atleast_1d(user_idx)
+        
+        # Tylko filmy ocenione na 4-5 gwiazdek (macierz przeliczona przy zmianie ocen)
+        scores = (self.high_rated_matrix[user_idx] @ self.movie_similarity).toarray()
+        scores[self._rated_mask(user_idx) if rated is None else rated] = -np.inf
+        scores[self.high_rated_counts[user_idx] == 0] = -np.inf
+        return scores
+        
+    def _svd_scores(self, user_idx, rated=None):
+        """Przewidywane oceny SVD dla bloku użytkowników; filmy już ocenione mają -inf"""
+        user_idx = np.atleast_1d(user_idx)
+        
+        rated = self._rated_mask(user_idx) if rated is None else rated
+        components = self.svd_model.components_
+        
+        # Czynniki użytkowników są wyliczone przy trenowaniu / add_ratings
+        scores = self.user_factors[user_idx] @ components
+        scores[rated] = -np.inf
+        
+        if self.factors_quantized:
+            # Najlepsi kandydaci z czynników int8 przeliczani dokładnie
+            n_candidates = min(RERANK_CANDIDATES, scores.shape[1])
+            candidates = np.argpartition(-scores, n_candidates - 1, axis=1)[:, :n_candidates]
+            scores[np.arange(len(user_idx))[:, None], candidates] = self._exact_svd_scores(user_idx, candidates)
+            scores[rated] = -np.inf
+        return scores
+        
+    def _exact_svd_scores(self, user_idx, candidates):
+        """Dokładne wyniki SVD kandydatów (blok użytkowników x kandydaci) - czynnik użytkownika = oceny @ components^T"""
+        components = self.svd_model.components_
+        exact = self.user_movie_matrix[user_idx] @ components.T
+        return np.einsum('bk,kbc->bc', exact, components[:, candidates])
+        
+    def _user_scores(self, user_idx, methods, rated):
+        """Wyniki kilku metod dla jednego użytkownika w jednym przebiegu (słownik metoda -> wektor)
+
+        Wiersze użytkownika (podobieństwo, wysokie oceny) czytane są wprost
+        z tablic CSR, a sumy ważone wierszy sąsiadów i filmów liczone przez
+        np.bincount - bez tworzenia macierzy rzadkich dla każdej metody.
+        Wyniki jak w score_block (z dokładnością do zaokrągleń); rated to
+        maska ocenionych filmów użytkownika (wektor).
+        """
+        n_movies = len(self.movie_index)
+        scores = {}
+        if 'collaborative' in methods:
+            start, stop = self.user_similarity.indptr[user_idx], self.user_similarity.indptr[user_idx + 1]
+            neighbors, weights = self.user_similarity.indices[start:stop], self.user_similarity.data[start:stop]
+            positions, owner = _row_entries(self.user_movie_matrix, neighbors)
+            cols = self.user_movie_matrix.indices[positions]
+            weighted_sum = np.bincount(cols, weights[owner] * self.user_movie_matrix.data[positions], n_movies)
+            similarity_sum = np.bincount(cols, np.abs(weights)[owner], n_movies)
+            collaborative = np.full(n_movies, -np.inf)
+            np.divide(weighted_sum, similarity_sum, out=collaborative, where=similarity_sum > 0)
+            collaborative[rated] = -np.inf
+            scores['collaborative'] = collaborative
+        if 'content' in methods:
+            start, stop = self.high_rated_matrix.indptr[user_idx], self.high_rated_matrix.indptr[user_idx + 1]
+            positions, owner = _row_entries(self.movie_similarity, self.high_rated_matrix.indices[start:stop])
+            content = np.bincount(self.movie_similarity.indices[positions],
+                                  self.high_rated_matrix.data[start:stop][owner] * self.movie_similarity.data[positions],
+                                  n_movies).astype(np.float64, copy=False)
+            content[rated] = -np.inf
+            if stop == start:
+                content[:] = -np.inf
+            scores['content'] = content
+        if 'svd' in methods:
+            scores['svd'] = self._svd_scores(user_idx, rated[None, :])[0]
+        if 'als' in methods:
+            scores['als'] = self._als_scores(user_idx, rated[None, :])[0]
+        return scores
         
-        user_idx = user_id - 1
-        user_ratings = self.user_movie_matrix.loc[user_id]
-        
-        # Znajdź podobnych użytkowników
-        similar_users = self.user_similarity[user_idx]
-        
-        # Przewidywane oceny dla filmów, których użytkownik nie ocenił
-        recommendations = {}
-        
-        for movie_id in self.user_movie_matrix.columns:
-            if user_ratings[movie_id] == 0:  # Film nie został oceniony
-                weighted_sum = 0
-                similarity_sum = 0
-                
-                for other_user_id in self.user_movie_matrix.index:
-                    if other_user_id != user_id:
-                        other_user_idx = other_user_id - 1
-                        other_user_rating = self.user_movie_matrix.loc[other_user_id, movie_id]
-                        
-                        if other_user_rating > 0:
-                            similarity = similar_users[other_user_idx]
-                            weighted_sum += similarity * other_user_rating
-                            similarity_sum += abs(similarity)
-                
-                if similarity_sum > 0:
-                    predicted_rating = weighted_sum / similarity_sum
-                    recommendations[movie_id] = predicted_rating
-        
-        # Sortuj i zwróć top N
-        top_recommendations = sorted(recommendations.items(), key=lambda x: x[1], reverse=True)[:n_recommendations]
-        
-        return self._format_recommendations(top_recommendations, "Collaborative Filtering (Users)")
-        
-    def get_movie_recommendations_content(self, user_id, n_recommendations=5):
+    def _als_scores(self, user_idx, rated=None):
+        """Przewidywane oceny ALS dla bloku użytkowników; filmy już ocenione mają -inf"""
+        user_idx = np.atleast_1d(user_idx)
+        scores = self.als_model.predict_block(user_idx)
+        scores[self._rated_mask(user_idx) if rated is None else rated] = -np.inf
+        return scores
+        
+    @timed('recommend.collaborative')
+    def get_user_recommendations_collaborative(self, user_id, n_recommendations=5, n_neighbors=None, filters=None):
+        """Rekomendacje oparte na collaborative filtering (użytkownicy)
+
+        n_neighbors ogranicza predykcję do k najbardziej podobnych użytkowników
+        (None = wszyscy użytkownicy); filters (MovieFilter) ogranicza kandydatów
+        - tak samo we wszystkich metodach rekomendacji.
+        """
+        if user_id not in self.user_index:
+            return RecommendationList(COLLABORATIVE, user_id,
+                                      message=f"Uzytkownik {user_id} nie istnieje w bazie danych")
+        
+        user_idx = self.user_index.get_loc(user_id)
+        
+        # Przewidywane oceny dla wszystkich filmów w jednym przebiegu
+        scores = self._collaborative_scores(user_idx, n_neighbors, self._rated_mask(user_idx, filters))[0]
+        
+        # Top N bez sortowania wszystkich wyników
+        top = _top_n_indices(scores, n_recommendations)
+        
+        return self._build_recommendations(user_id, top, scores[top], COLLABORATIVE)
+        
+    @timed('recommend.content')
+    def get_movie_recommendations_content(self, user_id, n_recommendations=5, filters=None):
         """Rekomendacje oparte na podobieństwie filmów"""
-        if user_id not in self.user_movie_matrix.index:
-            return f"Uzytkownik {user_id} nie istnieje w bazie danych"
+        if user_id not in self.user_index:
+            return RecommendationList(CONTENT, user_id,
+                                      message=f"Uzytkownik {user_id} nie istnieje w bazie danych")
         
-        user_ratings = self.user_movie_matrix.loc[user_id]
-        watched_movies = user_ratings[user_ratings > 0]
+        user_idx = self.user_index.get_loc(user_id)
         
         # Znajdź filmy podobne do tych, które użytkownik dobrze ocenił (4-5 gwiazdek)
-        high_rated_movies = watched_movies[watched_movies >= 4]
+        if self.high_rated_counts[user_idx] == 0:
+            return RecommendationList(CONTENT, user_id,
+                                      message="Uzytkownik nie ma wysoko ocenionych filmow")
         
-        if len(high_rated_movies) == 0:
-            return "Uzytkownik nie ma wysoko ocenionych filmow"
+        scores = self._content_scores(user_idx, self._rated_mask(user_idx, filters))[0]
         
-        recommendations = {}
+        # Top N bez sortowania wszystkich wyników
+        top = _top_n_indices(scores, n_recommendations)
         
-        for movie_id in high_rated_movies.index:
-            movie_idx = movie_id - 1
-            similar_movies = self.movie_similarity[movie_idx]
-            
-            for other_movie_id in self.user_movie_matrix.columns:
-                if user_ratings[other_movie_id] == 0:  # Film nie został oceniony
-                    other_movie_idx = other_movie_id - 1
-                    similarity = similar_movies[other_movie_idx]
-                    
-                    if other_movie_id not in recommendations:
-                        recommendations[other_movie_id] = 0
-                    
-                    recommendations[other_movie_id] += similarity * high_rated_movies[movie_id]
-        
-        # Sortuj i zwróć top N
-        top_recommendations = sorted(recommendations.items(), key=lambda x: x[1], reverse=True)[:n_recommendations]
-        
-        return self._format_recommendations(top_recommendations, "Content-based (Movie Similarity)")
-        
-    def get_svd_recommendations(self, user_id, n_recommendations=5):
-        """Rekomendacje oparte na modelu SVD"""
-        if user_id not in self.user_movie_matrix.index:
-            return f"Uzytkownik {user_id} nie istnieje w bazie danych"
+        return self._build_recommendations(user_id, top, scores[top], CONTENT)
+        
+    @timed('recommend.svd')
+    def get_svd_recommendations(self, user_id, n_recommendations=5, n_probe=None, filters=None):
+        """Rekomendacje oparte na modelu SVD
+
+        Jeśli zbudowano indeks ANN (build_ann_index), wyniki pochodzą z
+        przybliżonego przeszukania; n_probe steruje kompromisem recall/czas.
+        Z filtrem wyniki liczone są dokładnie (filtr mógłby odrzucić wszystkie
+        filmy przeszukanych list). Przy czynnikach int8 indeks zwraca
+        RERANK_CANDIDATES kandydatów, przeliczanych dokładnie jak w _svd_scores.
+        """
+        if user_id not in self.user_index:
+            return RecommendationList(SVD, user_id,
+                                      message=f"Uzytkownik {user_id} nie istnieje w bazie danych")
         
-        user_idx = user_id - 1
-        user_ratings = self.user_movie_matrix.loc[user_id]
+        user_idx = self.user_index.get_loc(user_id)
         
-        # Przekształć dane użytkownika przez model SVD
-        user_vector = self.user_movie_matrix.iloc[user_idx:user_idx+1].values
-        user_factors = self.svd_model.transform(user_vector)[0]
-        movie_factors = self.svd_model.components_.T
+        if self.ann_index is not None and (filters is None or filters.empty):
+            rated = self.rated_matrix[user_idx].indices
+            if not self.factors_quantized:
+                top, scores = self.ann_index.search(self.user_factors[user_idx], n_recommendations,
+                                                    n_probe, exclude=rated)
+                return self._build_recommendations(user_id, top, scores, SVD)
+            candidates, _ = self.ann_index.search(self.user_factors[user_idx],
+                                                  max(n_recommendations, RERANK_CANDIDATES), n_probe, exclude=rated)
+            candidates = np.sort(candidates)
+            scores = self._exact_svd_scores([user_idx], candidates[None, :])[0]
+            top = _top_n_indices(scores, n_recommendations)
+            return self._build_recommendations(user_id, candidates[top], scores[top], SVD)
         
-        # Oblicz przewidywane oceny
-        predictions = np.dot(user_factors, movie_factors.T)
+        predictions = self._svd_scores(user_idx, self._rated_mask(user_idx, filters))[0]
         
-        # Znajdź filmy, które użytkownik nie ocenił
-        recommendations = {}
-        for i, movie_id in enumerate(self.user_movie_matrix.columns):
-            if user_ratings[movie_id] == 0:
-                recommendations[movie_id] = predictions[i]
+        # Top N bez sortowania wszystkich wyników
+        top = _top_n_indices(predictions, n_recommendations)
         
-        # Sortuj i zwróć top N
-        top_recommendations = sorted(recommendations.items(), key=lambda x: x[1], reverse=True)[:n_recommendations]
+        return self._build_recommendations(user_id, top, predictions[top], SVD)
         
-        return self._format_recommendations(top_recommendations, "SVD Matrix Factorization")
+    @timed('recommend.als')
+    def get_als_recommendations(self, user_id, n_recommendations=5, filters=None):
+        """Rekomendacje oparte na modelu ALS"""
+        if user_id not in self.user_index:
+            return RecommendationList(ALS, user_id,
+                                      message=f"Uzytkownik {user_id} nie istnieje w bazie danych")
         
-    def _format_recommendations(self, recommendations, method_name):
-        """Formatuje rekomendacje z tytułami filmów"""
-        result = f"\nRekomendacje ({method_name}):\n"
-        result += "=" * 50 + "\n"
+        user_idx = self.user_index.get_loc(user_id)
+        predictions = self._als_scores(user_idx, self._rated_mask(user_idx, filters))[0]
         
-        for i, (movie_id, score) in enumerate(recommendations, 1):
-            movie_info = self.movies_df[self.movies_df['movie_id'] == movie_id].iloc[0]
-            result += f"{i}. {movie_info['title']} ({movie_info['year']})\n"
-            result += f"   Gatunek: {movie_info['genre']} | Reżyser: {movie_info['director']}\n"
-            result += f"   Przewidywana ocena: {score:.2f}\n\n"
+        # Top N bez sortowania wszystkich wyników
+        top = _top_n_indices(predictions, n_recommendations)
         
+        return self._build_recommendations(user_id, top, predictions[top], ALS)
+        
+    @timed('recommend.hybrid')
+    def get_hybrid_recommendations(self, user_id, n_recommendations=5, weights=None, fusion_depth=50, filters=None):
+        """Rekomendacje wszystkich metod w jednym przebiegu i lista połączona fuzją rang
+
+        Użytkownik wyszukiwany jest raz, maska ocenionych filmów liczona raz,
+        wyniki metod z weights (domyślnie HYBRID_WEIGHTS) jednym przebiegiem
+        _user_scores, a metadane filmów pobierane jednym zapytaniem. Film na pozycji r (od 1) listy
+        metody, w jej pierwszych max(fusion_depth, n_recommendations)
+        pozycjach, dostaje weight / (RRF_K + r); wynik listy połączonej to
+        suma po metodach. SVD liczone jest dokładnie, bez indeksu ANN.
+        filters (MovieFilter) dotyczy wszystkich list.
+        """
+        weights = HYBRID_WEIGHTS if weights is None else weights
+        unknown = set(weights) - set(self.SCORING_METHODS)
+        if unknown:
+            raise ValueError(f"Nieznana metoda rekomendacji: {sorted(unknown)}")
+        
+        result = HybridRecommendations(user_id)
+        if user_id not in self.user_index:
+            message = f"Uzytkownik {user_id} nie istnieje w bazie danych"
+            result.methods = {method: RecommendationList(METHOD_NAMES[method], user_id, message=message)
+                              for method in weights}
+            result.blended = RecommendationList(HYBRID, user_id, message=message)
+            return result
+        
+        user_idx = self.user_index.get_loc(user_id)
+        rated = self._rated_mask(user_idx, filters)[0]
+        depth = max(fusion_depth, n_recommendations)
+        
+        # Ranking każdej metody do głębokości fuzji; jego początek to lista top-N metody
+        rankings = {}
+        fused = np.zeros(len(self.movie_index))
+        method_scores = self._user_scores(user_idx, weights, rated)
+        for method, weight in weights.items():
+            scores = method_scores[method]
+            top = _top_n_indices(scores, depth)
+            rankings[method] = (top[:n_recommendations], scores[top[:n_recommendations]])
+            fused[top] += weight / (RRF_K + np.arange(1, len(top) + 1))
+        fused[fused == 0] = -np.inf
+        blended = _top_n_indices(fused, n_recommendations)
+        
+        # Metadane wszystkich filmów ze wszystkich list naraz
+        movie_idx = np.unique(np.concatenate([blended, *(top for top, _ in rankings.values())]))
+        movies = self._movie_metadata(movie_idx)
+        
+        for method, (top, scores) in rankings.items():
+            if method == 'content' and self.high_rated_counts[user_idx] == 0:
+                result.methods[method] = RecommendationList(CONTENT, user_id,
+                                                            message="Uzytkownik nie ma wysoko ocenionych filmow")
+            else:
+                result.methods[method] = RecommendationList(
+                    METHOD_NAMES[method], user_id, _scored_items(movies, top, scores))
+        result.blended = RecommendationList(HYBRID, user_id, _scored_items(movies, blended, fused[blended]))
         return result
         
-    def get_user_profile(self, user_id):
-        """Pokazuje profil użytkownika i jego oceny"""
-        if user_id not in self.user_movie_matrix.index:
+    @timed('recommend.metadata')
+    def get_metadata_recommendations(self, user_id, n_recommendations=5, filters=None):
+        """Rekomendacje content-based z metadanych filmów (gatunek, reżyser, przedział lat)
+
+        Wynik to jeden iloczyn wektora wysoko ocenionych filmów użytkownika
+        z metadata_similarity, więc rekomendowane mogą być też filmy, których
+        jeszcze nikt nie ocenił.
+        """
+        if user_id not in self.user_index:
+            return RecommendationList(METADATA, user_id,
+                                      message=f"Uzytkownik {user_id} nie istnieje w bazie danych")
+        
+        user_idx = self.user_index.get_loc(user_id)
+        start, stop = self.rating_offsets[user_idx], self.rating_offsets[user_idx + 1]
+        movie_rows = self.rating_movie_rows[start:stop]
+        ratings = self.ratings_df['rating'].to_numpy()[self.rating_order[start:stop]]
+        liked = movie_rows[(ratings >= HIGH_RATING) & (movie_rows >= 0)]
+        if len(liked) == 0:
+            return RecommendationList(METADATA, user_id,
+                                      message="Uzytkownik nie ma wysoko ocenionych filmow")
+        
+        profile = sparse.csr_matrix((np.ones(len(liked)), (np.zeros(len(liked), dtype=np.int64), liked)),
+                                    shape=(1, len(self.movies_df)))
+        scores = (profile @ self.metadata_similarity).toarray()[0]
+        scores[scores == 0] = -np.inf
+        scores[movie_rows[movie_rows >= 0]] = -np.inf
+        excluded = self.metadata_filter_index.excluded(filters)
+        if excluded is not None:
+            scores[excluded] = -np.inf
+        
+        top = _top_n_indices(scores, n_recommendations)
+        movies = self.movies_df.iloc[top]
+        items = [
+            Recommendation(int(movie_id), title, int(year), genre, director, float(score))
+            for movie_id, title, year, genre, director, score in zip(
+                movies['movie_id'], movies['title'], movies['year'], movies['genre'],
+                movies['director'], scores[top]
+            )
+        ]
+        return RecommendationList(METADATA, user_id, items)
+        
+    def recommend(self, user_id, method='svd', n_recommendations=5, filters=None):
+        """Rekomendacje wybranej metody ('collaborative', 'content', 'metadata', 'svd' lub 'als')"""
+        if method == 'collaborative':
+            return self.get_user_recommendations_collaborative(user_id, n_recommendations, filters=filters)
+        if method == 'content':
+            return self.get_movie_recommendations_content(user_id, n_recommendations, filters)
+        if method == 'metadata':
+            return self.get_metadata_recommendations(user_id, n_recommendations, filters)
+        if method == 'svd':
+            return self.get_svd_recommendations(user_id, n_recommendations, filters=filters)
+        if method == 'als':
+            return self.get_als_recommendations(user_id, n_recommendations, filters)
+        raise ValueError(f"Nieznana metoda rekomendacji: {method}")
+        
+    @timed('recommend.score_block')
+    def score_block(self, user_idx, method='svd', n_neighbors=None, rated=None):
+        """Wyniki wybranej metody dla bloku użytkowników (indeksy wierszy macierzy ocen)
+
+        Zwraca tablicę (len(user_idx), liczba filmów); filmy już ocenione
+        i niemożliwe do oceny mają wartość -inf. rated to opcjonalna maska
+        _rated_mask(user_idx), gdy blok jest oceniany kilkoma metodami.
+        """
+        metrics.count('recommend.scored_users', len(user_idx))
+        if method == 'collaborative':
+            return self._collaborative_scores(user_idx, n_neighbors, rated)
+        if method == 'content':
+            return self._content_scores(user_idx, rated)
+        if method == 'svd':
+            return self._svd_scores(user_idx, rated)
+        if method == 'als':
+            return self._als_scores(user_idx, rated)
+        raise ValueError(f"Nieznana metoda rekomendacji: {method}")
+        
+    @timed('recommend.batch')
+    def recommend_batch(self, user_ids, method='svd', n_recommendations=5, chunk_size=1000, n_neighbors=None,
+                        filters=None):
+        """Rekomendacje dla wielu użytkowników naraz
+
+        Użytkownicy są oceniani blokami po chunk_size wierszy, więc szczytowe
+        zużycie pamięci to ok. chunk_size x liczba filmów wyników. Zwraca
+        tablicę strukturalną (user_id, movie_id, score) posortowaną wg
+        użytkownika i pozycji; nieznani użytkownicy są pomijani. filters
+        (MovieFilter) dotyczy wszystkich użytkowników.
+        """
+        if method not in self.SCORING_METHODS:
+            raise ValueError(f"Nieznana metoda rekomendacji: {method}")
+        
+        user_idx = self.user_index.get_indexer(np.asarray(user_ids).ravel())
+        user_idx = user_idx[user_idx >= 0]
+        
+        results = []
+        for start in range(0, len(user_idx), chunk_size):
+            block = user_idx[start:start + chunk_size]
+            scores = self.score_block(block, method, n_neighbors, self._rated_mask(block, filters))
+            
+            for row, idx in zip(scores, block):
+                top = _top_n_indices(row, n_recommendations)
+                chunk = np.empty(len(top), dtype=RECOMMENDATION_DTYPE)
+                chunk['user_id'] = self.user_index[idx]
+                chunk['movie_id'] = self.movie_index[top]
+                chunk['score'] = row[top]
+                results.append(chunk)
+        
+        if not results:
+            return np.empty(0, dtype=RECOMMENDATION_DTYPE)
+        return np.concatenate(results)
+        
+    def _build_recommendations(self, user_id, movie_idx, scores, method_name):
+        """Tworzy listę rekomendacji z metadanymi filmów (kolumny macierzy -> wiersze movies_df)"""
+        items = _scored_items(self._movie_metadata(movie_idx), movie_idx, scores)
+        return RecommendationList(method_name, user_id, items)
+        
+    def _movie_metadata(self, movie_idx):
+        """Rekomendacje (bez wyniku) dla kolumn macierzy ocen: {kolumna: Recommendation lub None}
+
+        Metadane wszystkich kolumn są wyszukiwane w movies_df raz (i ponownie,
+        gdy add_ratings dopisze nowe filmy), a nie przy każdym zapytaniu.
+        None oznacza film bez wiersza w movies_df.
+        """
+        if self.movie_items is None or len(self.movie_items) != len(self.movie_index):
+            rows = self.movie_rows.get_indexer(self.movie_index)
+            movies = self.movies_df.iloc[np.maximum(rows, 0)]
+            self.movie_items = [
+                Recommendation(int(movie_id), title, int(year), genre, director, 0.0) if row >= 0 else None
+                for movie_id, row, title, year, genre, director in zip(
+                    self.movie_index, rows, movies['title'], movies['year'], movies['genre'], movies['director']
+                )
+            ]
+        return {idx: self.movie_items[idx] for idx in movie_idx}
+        
+    @timed('recommend.profile')
+    def get_user_profile(self, user_id, n_recent=5):
+        """Pokazuje profil użytkownika i jego oceny
+
+        Korzysta z indeksu ocen (create_rating_index), więc czyta tylko oceny
+        tego użytkownika, bez filtrowania i łączenia całych tabel.
+        """
+        if user_id not in self.user_index:
             return f"Uzytkownik {user_id} nie istnieje w bazie danych"
         
-        user_info = self.users_df[self.users_df['user_id'] == user_id].iloc[0]
-        user_ratings = self.ratings_df[self.ratings_df['user_id'] == user_id]
+        # Użytkownik dodany przez add_ratings może nie mieć wiersza w users_df
+        user_row = self.user_rows.get_indexer([user_id])[0]
+        user_info = self.users_df.iloc[user_row] if user_row >= 0 else {'age': 'brak danych', 'gender': 'brak danych'}
+        user_idx = self.user_index.get_loc(user_id)
+        start, stop = self.rating_offsets[user_idx], self.rating_offsets[user_idx + 1]
+        positions = self.rating_order[start:stop]
+        ratings = self.ratings_df['rating'].to_numpy()[positions]
         
         result = f"\nProfil uzytkownika {user_id}:\n"
         result += "=" * 30 + "\n"
         result += f"Wiek: {user_info['age']}\n"
         result += f"Płeć: {user_info['gender']}\n"
-        result += f"Liczba ocenionych filmow: {len(user_ratings)}\n"
-        result += f"Srednia ocena: {user_ratings['rating'].mean():.2f}\n\n"
+        result += f"Liczba ocenionych filmow: {len(positions)}\n"
+        result += f"Srednia ocena: {ratings.mean():.2f}\n\n"
         
+        # Oceny są już posortowane od najnowszej; pomijamy filmy bez metadanych
         result += "Ostatnie oceny:\n"
-        recent_ratings = user_ratings.merge(self.movies_df, on='movie_id').sort_values('timestamp', ascending=False).head(5)
+        movie_rows = self.rating_movie_rows[start:stop]
+        recent = np.flatnonzero(movie_rows >= 0)[:n_recent]
+        movies = self.movies_df.iloc[movie_rows[recent]]
         
-        for _, rating in recent_ratings.iterrows():
-            result += f"* {rating['title']} ({rating['year']}) - {rating['rating']} gwiazdek [{rating['genre']}]\n"
+        for title, year, genre, rating in zip(movies['title'], movies['year'], movies['genre'], ratings[recent]):
+            result += f"* {title} ({year}) - {rating} gwiazdek [{genre}]\n"
         
         return result
         
-    def train_model(self):
-        """Trenuje wszystkie modele"""
+    def train_model(self, similarity_top_k=None, n_jobs=1, data_dir='.'):
+        """Trenuje wszystkie modele
+
+        similarity_top_k ogranicza macierze podobieństwa do k sąsiadów na
+        wiersz (None = pełne podobieństwo); n_jobs to liczba procesów
+        liczących podobieństwo w trybie top-k.
+        """
         print("Rozpoczynanie trenowania modeli rekomendacji...\n")
         
-        if not self.load_data():
+        if not self.load_data(data_dir):
             return False
             
-        self.create_user_movie_matrix()
-        self.train_svd_model()
-        self.calculate_user_similarity()
-        self.calculate_movie_similarity()
+        self.fit(similarity_top_k, n_jobs)
         
         print("\nWszystkie modele zostaly wytrenowane!")
         return True
+        
+    @timed('train.fit', memory=True)
+    def fit(self, similarity_top_k=None, n_jobs=1):
+        """Trenuje modele na już wczytanych danych (ratings_df, movies_df, users_df)"""
+        self.n_jobs = n_jobs
+        self.create_user_movie_matrix()
+        self.create_rating_index()
+        self.train_svd_model()
+        self.train_als_model(n_jobs=n_jobs)
+        self.calculate_user_similarity(similarity_top_k, n_jobs=n_jobs)
+        self.calculate_movie_similarity(similarity_top_k, n_jobs=n_jobs)
+        
+        self.ratings_at_fit = self.user_movie_matrix.nnz
+        self.ratings_since_fit = 0
+        self.refit_scheduled = False
+        self.updated_users = set()
+        self.fitted_at = pd.Timestamp.now().isoformat()
+        self.model_version = next(_model_versions)
+        
+    def refit(self):
+        """Pełne ponowne trenowanie na wszystkich ocenach, z dotychczasowymi ustawieniami"""
+        print("Pelne ponowne trenowanie modeli...")
+        ann_params = None
+        if self.ann_index is not None:
+            ann_params = (len(self.ann_index.centroids), self.ann_index.n_probe)
+        quantized = self.factors_quantized
+        self.fit(self.similarity_top_k, self.n_jobs)
+        if quantized:
+            self.quantize_user_factors()
+        if ann_params is not None:
+            self.build_ann_index(*ann_params)
+        
+    @timed('update.add_ratings')
+    def add_ratings(self, new_ratings, refit_threshold=0.2, auto_refit=False):
+        """Dodaje nowe (lub zmienione) oceny i aktualizuje model przyrostowo
+
+        - oceny są dopisywane do ratings_df i macierzy ocen (nowi użytkownicy
+          i filmy dostają kolejne indeksy); zmieniona ocena zastępuje
+          poprzednią, a użytkownicy spoza users_df są przyjmowani (profil
+          bez wieku i płci),
+        - nowe filmy są rzutowane na przestrzeń SVD (bez zmiany components_
+          istniejących filmów), a zmienieni użytkownicy przeliczani przez
+          istniejące components_,
+        - przeliczane są wiersze podobieństwa dotkniętych użytkowników i filmów
+          (w trybie top-k listy sąsiadów pozostałych wierszy mogą być
+          nieaktualne do pełnego trenowania),
+        - gdy odsetek ocen dodanych od ostatniego trenowania przekroczy
+          refit_threshold, ustawiane jest refit_scheduled (a przy
+          auto_refit=True od razu wykonywany jest refit()).
+        Zwraca ten odsetek (drift).
+        """
+        if self.user_movie_matrix.shape[0] != len(self.user_index):
+            raise ValueError("Model shardu (select_users) jest tylko do odczytu")
+        new_ratings = new_ratings.drop_duplicates(['user_id', 'movie_id'], keep='last').copy()
+        unknown_movies = np.setdiff1d(new_ratings['movie_id'].unique(), self.movie_rows)
+        if len(unknown_movies):
+            raise ValueError(f"Brak metadanych filmow: {unknown_movies.tolist()}")
+        
+        # Dopisanie do zbioru ocen (w typach ratings_df, timestamp w mikrosekundach od epoki)
+        if 'timestamp' not in new_ratings:
+            new_ratings['timestamp'] = pd.Timestamp.now()
+        new_ratings['timestamp'] = to_epoch_us(new_ratings['timestamp'])
+        new_ratings = new_ratings[list(self.ratings_df.columns)].astype(self.ratings_df.dtypes.to_dict())
+        # Zmieniona ocena zastępuje poprzednią (profil liczy oceny z ratings_df)
+        superseded = pd.MultiIndex.from_arrays([self.ratings_df['user_id'], self.ratings_df['movie_id']]).isin(
+            pd.MultiIndex.from_arrays([new_ratings['user_id'], new_ratings['movie_id']]))
+        self.ratings_df = pd.concat([self.ratings_df[~superseded], new_ratings], ignore_index=True)
+        
+        # Nowi użytkownicy i filmy dostają kolejne indeksy (istniejące się nie zmieniają)
+        n_old_users, n_old_movies = self.user_movie_matrix.shape
+        new_users = np.setdiff1d(new_ratings['user_id'].unique(), self.user_index)
+        new_movies = np.setdiff1d(new_ratings['movie_id'].unique(), self.movie_index)
+        self.user_index = self.user_index.append(pd.Index(new_users))
+        self.movie_index = self.movie_index.append(pd.Index(new_movies))
+        if len(new_movies):
+            self.create_filter_index()
+        shape = (len(self.user_index), len(self.movie_index))
+        
+        rows = self.user_index.get_indexer(new_ratings['user_id'])
+        cols = self.movie_index.get_indexer(new_ratings['movie_id'])
+        values = new_ratings['rating'].to_numpy(dtype=self.user_movie_matrix.dtype)
+        
+        # Aktualizacja macierzy ocen: dodajemy różnicę względem poprzednich ocen
+        ratings_matrix = resize_csr(self.user_movie_matrix, shape)
+        previous = np.asarray(ratings_matrix[rows, cols]).ravel()
+        ratings_matrix = (ratings_matrix + sparse.csr_matrix((values - previous, (rows, cols)), shape=shape)).tocsr()
+        ratings_matrix.eliminate_zeros()
+        self._set_rating_matrix(ratings_matrix)
+        self.create_rating_index()
+        
+        affected_users = np.unique(rows)
+        affected_movies = np.unique(cols)
+        self._fold_in(affected_users, n_old_users, n_old_movies)
+        self._update_similarity_rows(affected_users, affected_movies)
+        self.model_version = next(_model_versions)
+        self.updated_users.update(new_ratings['user_id'].tolist())
+        
+        self.ratings_since_fit += len(new_ratings)
+        metrics.count('update.ratings', len(new_ratings))
+        drift = self.ratings_since_fit / max(self.ratings_at_fit, 1)
+        print(f"Dodano {len(new_ratings)} ocen (nowi uzytkownicy: {len(new_users)}, "
+              f"nowe filmy: {len(new_movies)}), drift: {drift:.1%}")
+        
+        if drift > refit_threshold:
+            self.refit_scheduled = True
+            if auto_refit:
+                self.refit()
+        return drift
+        
+    def _fold_in(self, affected_users, n_old_users, n_old_movies):
+        """Rzutuje nowe filmy i zmienionych użytkowników na istniejącą przestrzeń SVD
+
+        W modelu ALS nowe filmy i zmienieni użytkownicy są przeliczani
+        jednym krokiem ALS przy ustalonej drugiej stronie.
+        """
+        n_users, n_movies = self.user_movie_matrix.shape
+        if self.als_model is not None:
+            self.als_model.resize(n_users, n_movies)
+            self.als_model.update_items(self.movie_user_matrix, np.arange(n_old_movies, n_movies))
+            self.als_model.update_users(self.user_movie_matrix, affected_users)
+        
+        components = self.svd_model.components_
+        
+        # Użytkownicy rzutowani najpierw na znane filmy (stare components_)
+        self.user_factors = resize_rows(self.user_factors, n_users)
+        known = self.user_movie_matrix[affected_users][:, :n_old_movies]
+        self.user_factors[affected_users] = known @ components.T
+        
+        if n_movies > n_old_movies:
+            # Nowy film j: v_j = U^T r_j / sigma^2 (rzut kolumny ocen na czynniki użytkowników,
+            # potrzebne tylko czynniki użytkowników, którzy ocenili nowe filmy)
+            new_columns = self.movie_user_matrix[n_old_movies:]
+            raters = np.unique(new_columns.indices)
+            new_components = (new_columns[:, raters] @ self.user_factors[raters]).T / self.svd_model.singular_values_[:, None] ** 2
+            self.svd_model.components_ = np.hstack([components, new_components])
+            self.svd_model.n_features_in_ = n_movies
+            
+            # Ponowny rzut użytkowników - uwzględnia też oceny nowych filmów
+            self.user_factors[affected_users] = self.user_movie_matrix[affected_users] @ self.svd_model.components_.T
+            
+            if self.ann_index is not None:
+                self.build_ann_index(len(self.ann_index.centroids), self.ann_index.n_probe)
+        
+    def _update_similarity_rows(self, affected_users, affected_movies):
+        """Przelicza wiersze macierzy podobieństwa dla zmienionych użytkowników i filmów"""
+        for name, matrix, affected in (
+            ('user_similarity', self.user_movie_matrix, affected_users),
+            ('movie_similarity', self.movie_user_matrix, affected_movies),
+        ):
+            n = matrix.shape[0]
+            similarity = resize_csr(getattr(self, name), (n, n))
+            if self.similarity_top_k is None:
+                # Pełne podobieństwo jest symetryczne - podmieniamy wiersze i kolumny
+                new_rows = cosine_rows(matrix, affected)
+                similarity = replace_rows(similarity, affected, new_rows, symmetric=True)
+            else:
+                indices, scores = top_k_cosine_rows(matrix, affected, self.similarity_top_k)
+                new_rows = neighbors_to_csr(indices, scores, n)
+                similarity = replace_rows(similarity, affected, new_rows)
+            setattr(self, name, similarity)
+        
+    def select_users(self, user_ids):
+        """Kopia modelu obsługująca tylko wskazanych użytkowników (np. jeden shard)
+
+        Czynniki SVD i ALS, oceny (ratings_df, indeks ocen), dane
+        użytkowników i wiersze podobieństwa obejmują tylko user_ids. Ich
+        sąsiedzi z user_similarity są jedynie dodatkowymi wierszami macierzy
+        ocen (za wierszami user_ids, poza user_index), potrzebnymi w
+        collaborative filtering. Dane filmów są współdzielone. Kopia jest
+        tylko do odczytu (add_ratings zgłasza błąd).
+        """
+        owned = np.sort(self.user_index.get_indexer(user_ids))
+        if (owned < 0).any():
+            raise ValueError("Nieznani uzytkownicy w select_users")
+        halo = np.setdiff1d(self.user_similarity[owned].indices, owned)
+        rows = np.concatenate([owned, halo])
+        
+        subset = copy.copy(self)
+        subset.user_index = self.user_index[owned]
+        subset.ratings_df = self.ratings_df[self.ratings_df['user_id'].isin(subset.user_index)].reset_index(drop=True)
+        subset.users_df = self.users_df[self.users_df['user_id'].isin(subset.user_index)].reset_index(drop=True)
+        subset.user_rows = pd.Index(subset.users_df['user_id'])
+        subset._set_rating_matrix(self.user_movie_matrix[rows])
+        subset.create_rating_index()
+        subset.user_similarity = self.user_similarity[owned][:, rows].tocsr()
+        
+        if self.factors_quantized:
+            subset.user_factors = QuantizedVectors(self.user_factors.values[owned], self.user_factors.scales[owned])
+        else:
+            subset.user_factors = self.user_factors[owned]
+        subset.als_model = copy.copy(self.als_model)
+        subset.als_model.user_factors = self.als_model.user_factors[owned]
+        subset.als_model.user_bias = self.als_model.user_bias[owned]
+        subset.updated_users = self.updated_users & set(subset.user_index.tolist())
+        subset.model_version = next(_model_versions)
+        return subset
+        
+    @timed('model.save')
+    def save(self, path):
+        """Zapisuje wytrenowany model do katalogu (pliki .npy + manifest.json)
+
+        Katalog jest podmieniany atomowo, więc działające procesy mogą
+        bezpiecznie wczytywać poprzednią wersję.
+        """
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        manifest = {'format_version': MODEL_FORMAT_VERSION, 'arrays': {}}
+        
+        _save_array(tmp_path, 'user_ids', self.user_index.to_numpy(), manifest)
+        _save_array(tmp_path, 'movie_ids', self.movie_index.to_numpy(), manifest)
+        
+        for name in self._SPARSE_ARTIFACTS:
+            matrix = getattr(self, name)
+            _save_array(tmp_path, f"{name}.data", matrix.data, manifest)
+            _save_array(tmp_path, f"{name}.indices", matrix.indices, manifest)
+            _save_array(tmp_path, f"{name}.indptr", matrix.indptr, manifest)
+            manifest[name] = {'shape': list(matrix.shape)}
+        
+        for name in self._BITMAP_ARTIFACTS:
+            index = getattr(self, name)
+            _save_array(tmp_path, f"{name}.bitmaps", index.bitmaps, manifest)
+            _save_array(tmp_path, f"{name}.years", index.years, manifest)
+            manifest[name] = {'keys': index.keys, 'year_bucket': index.year_bucket}
+        
+        _save_array(tmp_path, 'svd_components', self.svd_model.components_, manifest)
+        _save_array(tmp_path, 'svd_singular_values', self.svd_model.singular_values_, manifest)
+        if self.factors_quantized:
+            _save_array(tmp_path, 'user_factors.values', self.user_factors.values, manifest)
+            _save_array(tmp_path, 'user_factors.scales', self.user_factors.scales, manifest)
+        else:
+            _save_array(tmp_path, 'user_factors', self.user_factors, manifest)
+        manifest['factors_quantized'] = self.factors_quantized
+        manifest['similarity_top_k'] = self.similarity_top_k
+        manifest['ratings_at_fit'] = self.ratings_at_fit
+        manifest['ratings_since_fit'] = self.ratings_since_fit
+        manifest['fitted_at'] = self.fitted_at
+        _save_array(tmp_path, 'updated_users', np.array(sorted(self.updated_users), dtype=np.int64), manifest)
+        
+        als = self.als_model
+        _save_array(tmp_path, 'als_user_factors', als.user_factors, manifest)
+        _save_array(tmp_path, 'als_item_factors', als.item_factors, manifest)
+        _save_array(tmp_path, 'als_user_bias', als.user_bias, manifest)
+        _save_array(tmp_path, 'als_item_bias', als.item_bias, manifest)
+        manifest['als'] = {
+            'n_factors': als.n_factors, 'regularization': als.regularization,
+            'n_iter': als.n_iter, 'global_mean': als.global_mean,
+        }
+        
+        if self.ann_index is not None:
+            _save_array(tmp_path, 'ann_centroids', self.ann_index.centroids, manifest)
+            _save_array(tmp_path, 'ann_list_items', self.ann_index.list_items, manifest)
+            _save_array(tmp_path, 'ann_list_offsets', self.ann_index.list_offsets, manifest)
+            manifest['ann_index'] = {'n_probe': self.ann_index.n_probe}
+        
+        # Oceny kolumnami (timestamp jako mikrosekundy od epoki) wraz z indeksem ocen użytkowników
+        for column in self.ratings_df.columns:
+            _save_array(tmp_path, f"ratings.{column}", self.ratings_df[column].to_numpy(), manifest)
+        _save_array(tmp_path, 'rating_order', self.rating_order, manifest)
+        _save_array(tmp_path, 'rating_offsets', self.rating_offsets, manifest)
+        _save_array(tmp_path, 'rating_movie_rows', self.rating_movie_rows, manifest)
+        
+        # Metadane filmów i użytkowników są małe - zwykłe CSV
+        self.movies_df.to_csv(os.path.join(tmp_path, 'movies.csv'), index=False)
+        self.users_df.to_csv(os.path.join(tmp_path, 'users.csv'), index=False)
+        
+        with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        
+        old_path = f"{path}.old-{os.getpid()}"
+        if os.path.exists(path):
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        print(f"Model zapisany w {path}")
+        
+    @staticmethod
+    def saved_model_available(path):
+        """Czy w katalogu jest model zapisany przez save() w obsługiwanej wersji formatu
+
+        False także dla modelu ze starszej wersji - trzeba go wytrenować ponownie.
+        """
+        try:
+            with open(os.path.join(path, 'manifest.json')) as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        return manifest.get('format_version') == MODEL_FORMAT_VERSION
+        
+    @classmethod
+    @timed('model.load')
+    def load(cls, path, mmap_mode='r'):
+        """Wczytuje model zapisany przez save() bez ponownego trenowania
+
+        Przy mmap_mode='r' tablice są mapowane z plików (np.memmap), więc
+        wiele procesów współdzieli jedną kopię w page cache.
+        """
+        with open(os.path.join(path, 'manifest.json')) as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != MODEL_FORMAT_VERSION:
+            raise ValueError(f"Nieobslugiwana wersja formatu modelu: {manifest.get('format_version')}")
+        
+        recommender = cls()
+        recommender.movies_df = pd.read_csv(os.path.join(path, 'movies.csv'))
+        recommender.users_df = pd.read_csv(os.path.join(path, 'users.csv'))
+        recommender.create_lookups()
+        
+        recommender.ratings_df = pd.DataFrame({
+            'user_id': _load_array(path, 'ratings.user_id', mmap_mode),
+            'movie_id': _load_array(path, 'ratings.movie_id', mmap_mode),
+            'rating': _load_array(path, 'ratings.rating', mmap_mode),
+            'timestamp': _load_array(path, 'ratings.timestamp', mmap_mode),
+        }, copy=False)
+        
+        recommender.user_index = pd.Index(_load_array(path, 'user_ids', mmap_mode))
+        recommender.movie_index = pd.Index(_load_array(path, 'movie_ids', mmap_mode))
+        recommender.item_features, recommender.feature_names = item_feature_matrix(recommender.movies_df)
+        for name, movie_ids in (('filter_index', recommender.movie_index),
+                                ('metadata_filter_index', recommender.movies_df['movie_id'])):
+            setattr(recommender, name, BitmapIndex(
+                movie_ids, _load_array(path, f"{name}.years", mmap_mode),
+                _load_array(path, f"{name}.bitmaps", mmap_mode),
+                [tuple(key) for key in manifest[name]['keys']], manifest[name]['year_bucket'],
+            ))
+        recommender.rating_order = _load_array(path, 'rating_order', mmap_mode)
+        recommender.rating_offsets = _load_array(path, 'rating_offsets', mmap_mode)
+        recommender.rating_movie_rows = _load_array(path, 'rating_movie_rows', mmap_mode)
+        
+        for name in cls._SPARSE_ARTIFACTS:
+            matrix = sparse.csr_matrix(
+                (_load_array(path, f"{name}.data", mmap_mode),
+                 _load_array(path, f"{name}.indices", mmap_mode),
+                 _load_array(path, f"{name}.indptr", mmap_mode)),
+                shape=tuple(manifest[name]['shape']), copy=False
+            )
+            setattr(recommender, name, matrix)
+        recommender.high_rated_counts = np.diff(recommender.high_rated_matrix.indptr)
+        
+        # Model SVD odtworzony z zapisanych składowych
+        components = _load_array(path, 'svd_components', mmap_mode)
+        recommender.svd_model = TruncatedSVD(n_components=components.shape[0], random_state=42)
+        recommender.svd_model.components_ = components
+        recommender.svd_model.singular_values_ = _load_array(path, 'svd_singular_values', mmap_mode)
+        recommender.svd_model.n_features_in_ = components.shape[1]
+        if manifest['factors_quantized']:
+            recommender.user_factors = QuantizedVectors(_load_array(path, 'user_factors.values', mmap_mode),
+                                                        _load_array(path, 'user_factors.scales', mmap_mode))
+        else:
+            recommender.user_factors = _load_array(path, 'user_factors', mmap_mode)
+        recommender.similarity_top_k = manifest['similarity_top_k']
+        recommender.ratings_at_fit = manifest['ratings_at_fit']
+        recommender.ratings_since_fit = manifest['ratings_since_fit']
+        recommender.fitted_at = manifest['fitted_at']
+        recommender.updated_users = set(_load_array(path, 'updated_users', None).tolist())
+        
+        als = manifest['als']
+        recommender.als_model = ALSModel(als['n_factors'], als['regularization'], als['n_iter'])
+        recommender.als_model.global_mean = als['global_mean']
+        recommender.als_model.user_factors = _load_array(path, 'als_user_factors', mmap_mode)
+        recommender.als_model.item_factors = _load_array(path, 'als_item_factors', mmap_mode)
+        recommender.als_model.user_bias = _load_array(path, 'als_user_bias', mmap_mode)
+        recommender.als_model.item_bias = _load_array(path, 'als_item_bias', mmap_mode)
+        
+        if 'ann_index' in manifest:
+            ann_index = IVFIndex(n_probe=manifest['ann_index']['n_probe'])
+            ann_index.vectors = components.T
+            ann_index.centroids = _load_array(path, 'ann_centroids', mmap_mode)
+            ann_index.list_items = _load_array(path, 'ann_list_items', mmap_mode)
+            ann_index.list_offsets = _load_array(path, 'ann_list_offsets', mmap_mode)
+            recommender.ann_index = ann_index
+        recommender.model_version = next(_model_versions)
+        
+        print(f"Model wczytany z {path}")
+        return recommender
 
 # Funkcja pomocnicza do demonstracji
 def demo_recommendations():
@@ -268,6 +1337,7 @@ def demo_recommendations():
         print(recommender.get_user_recommendations_collaborative(user_id, 3))
         print(recommender.get_movie_recommendations_content(user_id, 3))
         print(recommender.get_svd_recommendations(user_id, 3))
+        print(recommender.get_als_recommendations(user_id, 3))
 
 if __name__ == "__main__":
     demo_recommendations()
@@ -0,0 +1,67 @@
+import numpy as np
+
+
+def quantize_rows(vectors):
+    """Kwantyzacja int8 z osobną skalą dla każdego wiersza (największa |wartość| -> 127)
+
+    Zwraca (wartości int8, skale float32); wiersz ~ wartości * skala.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1, initial=0) / 127
+    scales[scales == 0] = 1
+    values = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return values, scales.astype(np.float32)
+
+
+class QuantizedVectors:
+    """Wektory czynników (wiersze) w int8 ze skalą na wektor - ok. 4x mniej pamięci niż float32
+
+    Indeksowanie zwraca wektory zdekwantyzowane do float32, a przypisanie
+    kwantyzuje nowe wartości, więc obiekt zastępuje tablicę float32 tam,
+    gdzie czyta się i zapisuje wybrane wiersze.
+    """
+
+    def __init__(self, values, scales):
+        self.values = values
+        self.scales = scales
+
+    @classmethod
+    def from_float(cls, vectors):
+        return cls(*quantize_rows(vectors))
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.scales.nbytes
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, rows):
+        return self.values[rows].astype(np.float32) * self.scales[rows, None]
+
+    def __setitem__(self, rows, vectors):
+        values, scales = quantize_rows(np.atleast_2d(vectors))
+        self.values[rows] = values.reshape(self.values[rows].shape)
+        self.scales[rows] = scales.reshape(self.scales[rows].shape)
+
+    def to_float(self):
+        """Wszystkie wektory jako ciągła tablica float32"""
+        return self[:]
+
+
+def resize_rows(factors, n_rows):
+    """Kopia czynników (float lub QuantizedVectors) z dopisanymi zerowymi wierszami do n_rows
+
+    Zawsze kopiuje - tablice mogą być mapowane z dysku tylko do odczytu.
+    """
+    extra = n_rows - len(factors)
+    if isinstance(factors, QuantizedVectors):
+        return QuantizedVectors(
+            np.vstack([factors.values, np.zeros((extra, factors.shape[1]), dtype=np.int8)]),
+            np.concatenate([factors.scales, np.ones(extra, dtype=np.float32)]),
+        )
+    return np.vstack([factors, np.zeros((extra, factors.shape[1]), dtype=factors.dtype)])
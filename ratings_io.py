@@ -0,0 +1,113 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Kolumny ocen i ich zwarte typy (zamiast domyślnych int64/float64/object)
+RATING_COLUMNS = ['user_id', 'movie_id', 'rating', 'timestamp']
+ID_DTYPE = np.int32
+RATING_DTYPE = np.float32
+TIMESTAMP_DTYPE = np.int64
+
+# Domyślna liczba wierszy wczytywanych naraz
+RATINGS_CHUNKSIZE = 1_000_000
+
+
+def to_epoch_us(timestamps):
+    """Zamienia kolumnę czasu na mikrosekundy od epoki (int64)
+
+    Tekst i daty są parsowane; liczby traktowane są jako już podane w
+    mikrosekundach od epoki.
+    """
+    timestamps = pd.Series(timestamps)
+    if pd.api.types.is_numeric_dtype(timestamps):
+        return timestamps.to_numpy(dtype=TIMESTAMP_DTYPE)
+    parsed = pd.to_datetime(timestamps).to_numpy(dtype='datetime64[us]')
+    return parsed.astype(TIMESTAMP_DTYPE)
+
+
+def _compact_chunk(chunk):
+    """Zwraca kolumny fragmentu ocen jako tablice o zwartych typach"""
+    columns = {
+        'user_id': np.asarray(chunk['user_id'], dtype=ID_DTYPE),
+        'movie_id': np.asarray(chunk['movie_id'], dtype=ID_DTYPE),
+        'rating': np.asarray(chunk['rating'], dtype=RATING_DTYPE),
+    }
+    names = chunk.dtype.names if isinstance(chunk, np.ndarray) else chunk.columns
+    if 'timestamp' in names:
+        columns['timestamp'] = to_epoch_us(chunk['timestamp'])
+    else:
+        columns['timestamp'] = np.zeros(len(columns['user_id']), dtype=TIMESTAMP_DTYPE)
+    return columns
+
+
+def iter_rating_chunks(path, chunksize=RATINGS_CHUNKSIZE):
+    """Czyta plik ocen fragmentami i zwraca słowniki kolumn o zwartych typach
+
+    Obsługiwane formaty (wg rozszerzenia): .csv, .parquet, .feather (v2,
+    mapowany z dysku) oraz .npy (tablica strukturalna z polami jak
+    RATING_COLUMNS, mapowana z dysku).
+    """
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.csv':
+        dtypes = {'user_id': ID_DTYPE, 'movie_id': ID_DTYPE, 'rating': RATING_DTYPE}
+        for chunk in pd.read_csv(path, chunksize=chunksize, dtype=dtypes):
+            yield _compact_chunk(chunk)
+
+    elif extension == '.parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Odczyt plikow Parquet wymaga pakietu pyarrow")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield _compact_chunk(batch.to_pandas())
+
+    elif extension == '.feather':
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("Odczyt plikow Feather wymaga pakietu pyarrow")
+        # Feather v2 to plik Arrow IPC - mapowany z dysku i czytany partiami
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                for start in range(0, batch.num_rows, chunksize):
+                    yield _compact_chunk(batch.slice(start, chunksize).to_pandas())
+
+    elif extension == '.npy':
+        ratings = np.load(path, mmap_mode='r')
+        for start in range(0, len(ratings), chunksize):
+            yield _compact_chunk(ratings[start:start + chunksize])
+
+    else:
+        raise ValueError(f"Nieobslugiwany format pliku ocen: {path}")
+
+
+def read_ratings(path, chunksize=RATINGS_CHUNKSIZE):
+    """Wczytuje oceny strumieniowo do zwartego DataFrame (int32 id, float32/int8 ocena, int64 czas)
+
+    Fragmenty są od razu zamieniane na tablice o małych typach, więc pełny
+    DataFrame z domyślnymi typami nigdy nie powstaje. Kolumny są sklejane
+    po jednej, a fragmenty sklejonej kolumny od razu zwalniane - szczyt
+    pamięci to wynik plus jedna kolumna, a nie podwojone oceny. Jeśli
+    wszystkie oceny są całkowite, kolumna rating ma typ int8.
+    """
+    parts = {name: [] for name in RATING_COLUMNS}
+    integral = True
+    for chunk in iter_rating_chunks(path, chunksize):
+        for name in RATING_COLUMNS:
+            parts[name].append(chunk[name])
+        ratings = chunk['rating']
+        integral = integral and np.array_equal(ratings, np.round(ratings)) and np.all(np.abs(ratings) <= 127)
+
+    columns = {}
+    for name, dtype in zip(RATING_COLUMNS, [ID_DTYPE, ID_DTYPE, RATING_DTYPE, TIMESTAMP_DTYPE]):
+        chunks = parts.pop(name)
+        if name == 'rating' and integral:
+            # Fragmenty rzutowane osobno - bez pełnej kolumny float32
+            chunks = [chunk.astype(np.int8) for chunk in chunks]
+            dtype = np.int8
+        columns[name] = np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype)
+    return pd.DataFrame(columns, copy=False)
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class RecommendationCache:
+    """Ograniczony cache wyników rekomendacji w pamięci procesu (LRU + TTL)
+
+    Klucz to (user_id, metoda, n, wersja modelu). Gdy pojawi się klucz z
+    nowszą wersją modelu (po trenowaniu lub add_ratings), wpisy starszych
+    wersji są usuwane. Bezpieczny dla wielu wątków.
+    """
+
+    def __init__(self, max_size=10_000, ttl=300.0, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.model_version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self, version):
+        """Przechodzi na nowszą wersję modelu; False dla wersji starszej niż bieżąca"""
+        if self.model_version is not None and version < self.model_version:
+            return False
+        if version != self.model_version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.model_version = version
+        return True
+
+    def get(self, user_id, method, n, version):
+        """Zwraca zapisany wynik albo None (brak, wygasł lub inna wersja modelu)"""
+        key = (user_id, method, n, version)
+        with self._lock:
+            entry = self._entries.get(key) if self._check_version(version) else None
+            if entry is not None and self.clock() - entry[0] > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id, method, n, version, value):
+        """Zapisuje wynik, usuwając najdawniej używane wpisy ponad max_size"""
+        key = (user_id, method, n, version)
+        with self._lock:
+            if not self._check_version(version):
+                return
+            self._entries[key] = (self.clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, user_id, method, n, version, compute):
+        """Wynik z cache albo compute() (wynik jest zapisywany)
+
+        compute() wywoływane jest poza blokadą, więc równoległe zapytania
+        o ten sam klucz mogą policzyć wynik niezależnie.
+        """
+        value = self.get(user_id, method, n, version)
+        if value is None:
+            value = compute()
+            self.put(user_id, method, n, version, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Liczniki cache (do endpointu z metrykami)"""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'model_version': self.model_version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
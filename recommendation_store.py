@@ -0,0 +1,134 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from movie_recommendation_system import METHOD_NAMES, _load_array, _save_array, _top_n_indices
+
+# Wersja formatu magazynu rekomendacji
+STORE_FORMAT_VERSION = 2
+
+
+def materialize(recommender, path, n_recommendations=20, methods=tuple(METHOD_NAMES),
+                chunk_size=1000):
+    """Liczy top-N rekomendacji każdej metody dla wszystkich użytkowników i zapisuje je na dysk
+
+    Dla każdej metody zapisywane są tablice o stałej szerokości
+    (liczba użytkowników x n_recommendations): movie_id (int32, -1 =
+    brak) i wynik (float32), oraz posortowane user_id (wiersz = pozycja
+    użytkownika w user_ids, wyszukiwana binarnie). Użytkownicy
+    liczeni są blokami po chunk_size (jedno wywołanie score_block na blok).
+    Katalog jest podmieniany atomowo, jak przy save().
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    manifest = {
+        'format_version': STORE_FORMAT_VERSION,
+        'fitted_at': recommender.fitted_at,
+        'n_recommendations': n_recommendations,
+        'methods': list(methods),
+        'arrays': {},
+    }
+
+    # Wiersze magazynu w kolejności rosnących user_id (dowolne id, bez tablicy gęstej)
+    all_idx = np.argsort(recommender.user_index.to_numpy(), kind='stable')
+    user_ids = recommender.user_index.to_numpy()[all_idx]
+    _save_array(tmp_path, 'user_ids', user_ids, manifest)
+
+    movie_ids = recommender.movie_index.to_numpy()
+    for method in methods:
+        top_ids = np.full((len(user_ids), n_recommendations), -1, dtype=np.int32)
+        top_scores = np.zeros((len(user_ids), n_recommendations), dtype=np.float32)
+        for start in range(0, len(user_ids), chunk_size):
+            block = all_idx[start:start + chunk_size]
+            scores = recommender.score_block(block, method)
+            for row, position in zip(scores, range(start, start + len(block))):
+                top = _top_n_indices(row, n_recommendations)
+                top_ids[position, :len(top)] = movie_ids[top]
+                top_scores[position, :len(top)] = row[top]
+        _save_array(tmp_path, f"{method}.movie_ids", top_ids, manifest)
+        _save_array(tmp_path, f"{method}.scores", top_scores, manifest)
+
+    with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    old_path = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    print(f"Rekomendacje zapisane w {path} ({len(user_ids)} uzytkownikow)")
+    return RecommendationStore.open(path)
+
+
+def store_available(path):
+    """Czy w katalogu jest magazyn zapisany przez materialize() w obsługiwanej wersji formatu"""
+    try:
+        with open(os.path.join(path, 'manifest.json')) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False
+    return manifest.get('format_version') == STORE_FORMAT_VERSION
+
+
+class RecommendationStore:
+    """Wczytany (mmap) magazyn rekomendacji zapisany przez materialize()"""
+
+    def __init__(self, manifest, user_ids, movie_ids, scores):
+        self.fitted_at = manifest['fitted_at']
+        self.n_recommendations = manifest['n_recommendations']
+        self.user_ids = user_ids
+        self.movie_ids = movie_ids
+        self.scores = scores
+
+    @classmethod
+    def open(cls, path, mmap_mode='r'):
+        with open(os.path.join(path, 'manifest.json')) as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != STORE_FORMAT_VERSION:
+            raise ValueError(f"Nieobslugiwana wersja formatu rekomendacji: {manifest.get('format_version')}")
+        movie_ids = {method: _load_array(path, f"{method}.movie_ids", mmap_mode) for method in manifest['methods']}
+        scores = {method: _load_array(path, f"{method}.scores", mmap_mode) for method in manifest['methods']}
+        return cls(manifest, _load_array(path, 'user_ids', mmap_mode), movie_ids, scores)
+
+    def lookup(self, recommender, user_id, method='svd', n_recommendations=5):
+        """Zapisane rekomendacje jako RecommendationList albo None, gdy trzeba je policzyć na żywo
+
+        None oznacza: magazyn z innego trenowania, nieznaną metodę lub zbyt
+        małe n, użytkownika spoza magazynu (nowego), zmienionego przez
+        add_ratings albo bez zapisanych rekomendacji (np. komunikat
+        o braku wysoko ocenionych filmów).
+        """
+        if (self.fitted_at != recommender.fitted_at or method not in self.movie_ids
+                or n_recommendations > self.n_recommendations or user_id in recommender.updated_users):
+            return None
+        row = np.searchsorted(self.user_ids, user_id)
+        if row == len(self.user_ids) or self.user_ids[row] != user_id:
+            return None
+
+        movie_ids = self.movie_ids[method][row, :n_recommendations]
+        movie_ids = movie_ids[movie_ids >= 0]
+        if len(movie_ids) == 0:
+            return None
+        scores = self.scores[method][row, :len(movie_ids)]
+        movie_idx = recommender.movie_index.get_indexer(movie_ids)
+        return recommender._build_recommendations(user_id, movie_idx, scores, METHOD_NAMES[method])
+
+
+if __name__ == "__main__":
+    import sys
+    from movie_recommendation_system import MovieRecommendationSystem
+
+    # python recommendation_store.py [katalog_modelu] [katalog_rekomendacji]
+    model_dir = sys.argv[1] if len(sys.argv) > 1 else 'model'
+    store_dir = sys.argv[2] if len(sys.argv) > 2 else 'recommendations'
+    if MovieRecommendationSystem.saved_model_available(model_dir):
+        recommender = MovieRecommendationSystem.load(model_dir)
+    else:
+        recommender = MovieRecommendationSystem()
+        if not recommender.train_model():
+            sys.exit(1)
+        recommender.save(model_dir)
+    materialize(recommender, store_dir)
@@ -0,0 +1,271 @@
+import filecmp
+import json
+import multiprocessing
+import os
+import queue
+import shutil
+import sys
+import threading
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+from movie_recommendation_system import MovieRecommendationSystem
+
+# Wersja formatu katalogu shardów (partition)
+SHARD_FORMAT_VERSION = 1
+
+# Artefakty filmów - identyczne we wszystkich shardach, zapisywane raz w items/
+# i podlinkowane (hard link) do katalogów shardów, więc page cache ma jedną kopię
+ITEM_ARTIFACTS = (
+    'movie_ids', 'svd_components', 'svd_singular_values', 'als_item_factors', 'als_item_bias',
+    'movie_similarity.data', 'movie_similarity.indices', 'movie_similarity.indptr',
+    'metadata_similarity.data', 'metadata_similarity.indices', 'metadata_similarity.indptr',
+    'filter_index.bitmaps', 'filter_index.years',
+    'metadata_filter_index.bitmaps', 'metadata_filter_index.years',
+    'ann_centroids', 'ann_list_items', 'ann_list_offsets',
+)
+
+# Metody systemu rekomendacji dostępne przez router (pierwszy argument to user_id)
+SHARD_CALLS = ('recommend', 'get_hybrid_recommendations', 'get_user_profile')
+
+
+def user_shards(user_ids, n_shards):
+    """Numer shardu dla każdego user_id - hash splitmix64, taki sam w każdym procesie i na każdej maszynie"""
+    x = np.asarray(user_ids, dtype=np.int64).astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    x = x ^ (x >> np.uint64(31))
+    return (x % np.uint64(n_shards)).astype(np.int64)
+
+
+def shard_path(path, shard):
+    return os.path.join(path, f"shard-{shard:03d}")
+
+
+def partition(model_dir, path, n_shards):
+    """Dzieli zapisany model na n_shards katalogów wg hasha user_id (user_shards)
+
+    Każdy shard to model (save/load) z danymi tylko swoich użytkowników;
+    oceny ich sąsiadów są jedynie dodatkowymi wierszami macierzy ocen
+    (collaborative filtering). Artefakty filmów są
+    zapisywane raz w path/items i linkowane do shardów (gdy system plików
+    nie obsługuje hard linków, shard zachowuje własną kopię). Katalog jest
+    podmieniany atomowo, jak w save().
+    """
+    recommender = MovieRecommendationSystem.load(model_dir, mmap_mode=None)
+    owners = user_shards(recommender.user_index, n_shards)
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(os.path.join(tmp_path, 'items'))
+    manifest = {'format_version': SHARD_FORMAT_VERSION, 'n_shards': n_shards,
+                'fitted_at': recommender.fitted_at, 'shards': []}
+
+    for shard in range(n_shards):
+        owned = recommender.user_index[owners == shard]
+        subset = recommender.select_users(owned)
+        subset.save(shard_path(tmp_path, shard))
+        manifest['shards'].append({'users': len(owned), 'neighbor_rows': subset.user_movie_matrix.shape[0] - len(owned)})
+
+    shared = []
+    for name in ITEM_ARTIFACTS:
+        item_file = os.path.join(tmp_path, 'items', f"{name}.npy")
+        first_file = os.path.join(shard_path(tmp_path, 0), f"{name}.npy")
+        if not os.path.exists(first_file):
+            continue
+        shutil.copyfile(first_file, item_file)
+        for shard in range(n_shards):
+            shard_file = os.path.join(shard_path(tmp_path, shard), f"{name}.npy")
+            if not filecmp.cmp(item_file, shard_file, shallow=False):
+                continue
+            try:
+                os.link(item_file, f"{shard_file}.link")
+            except OSError:
+                continue
+            os.replace(f"{shard_file}.link", shard_file)
+        shared.append(name)
+    manifest['item_artifacts'] = shared
+
+    with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    old_path = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    print(f"Model podzielony na {n_shards} shardow w {path}")
+    return manifest
+
+
+def read_manifest(path):
+    """Manifest katalogu shardów; None, gdy brak lub w innej wersji formatu"""
+    try:
+        with open(os.path.join(path, 'manifest.json')) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    return manifest if manifest.get('format_version') == SHARD_FORMAT_VERSION else None
+
+
+def _serve_shard(path, authkey, ready):
+    """Proces shardu: wczytuje swój model (mmap) i obsługuje połączenia routera"""
+    try:
+        recommender = MovieRecommendationSystem.load(path, mmap_mode='r')
+        listener = Listener(('127.0.0.1', 0), authkey=authkey)
+    except Exception as e:
+        ready.send(('error', str(e)))
+        return
+    ready.send(('ok', listener.address))
+    ready.close()
+    while True:
+        connection = listener.accept()
+        threading.Thread(target=_handle_connection, args=(recommender, connection), daemon=True).start()
+
+
+def _handle_connection(recommender, connection):
+    with connection:
+        while True:
+            try:
+                name, args, kwargs = connection.recv()
+            except EOFError:
+                return
+            try:
+                if name not in SHARD_CALLS:
+                    raise ValueError(f"Niedozwolone wywolanie shardu: {name}")
+                connection.send(('ok', getattr(recommender, name)(*args, **kwargs)))
+            except Exception as e:
+                connection.send(('error', e))
+
+
+class ShardRouter:
+    """Kieruje zapytania do procesu shardu, który jest właścicielem użytkownika
+
+    Połączenia z shardami są utrzymywane i używane ponownie (pula na shard),
+    więc router można wywoływać z wielu wątków naraz. Wyjątki z shardu są
+    zgłaszane ponownie w wywołującym.
+    """
+
+    def __init__(self, addresses, authkey):
+        self.addresses = addresses
+        self.authkey = authkey
+        self._idle = [queue.SimpleQueue() for _ in addresses]
+        self.requests = [0] * len(addresses)
+
+    @property
+    def n_shards(self):
+        return len(self.addresses)
+
+    def shard_of(self, user_id):
+        return int(user_shards([user_id], self.n_shards)[0])
+
+    def call(self, name, user_id, *args, **kwargs):
+        """Wywołuje metodę name systemu rekomendacji w shardzie użytkownika"""
+        shard = self.shard_of(user_id)
+        try:
+            connection = self._idle[shard].get_nowait()
+        except queue.Empty:
+            connection = Client(self.addresses[shard], authkey=self.authkey)
+        try:
+            connection.send((name, (user_id, *args), kwargs))
+            status, value = connection.recv()
+        except Exception:
+            connection.close()
+            raise
+        self._idle[shard].put(connection)
+        self.requests[shard] += 1
+        if status == 'error':
+            raise value
+        return value
+
+    def recommend(self, user_id, method='svd', n_recommendations=5, filters=None):
+        return self.call('recommend', user_id, method, n_recommendations, filters)
+
+    def get_hybrid_recommendations(self, user_id, n_recommendations=5, **kwargs):
+        return self.call('get_hybrid_recommendations', user_id, n_recommendations, **kwargs)
+
+    def get_user_profile(self, user_id, n_recent=5):
+        return self.call('get_user_profile', user_id, n_recent)
+
+    def close(self):
+        for idle in self._idle:
+            while True:
+                try:
+                    idle.get_nowait().close()
+                except queue.Empty:
+                    break
+
+
+class ShardedRecommendationService:
+    """Lokalne procesy shardów (zamiast osobnych maszyn) i router do nich
+
+    Każdy proces wczytuje swój katalog z partition() z mmap_mode='r' -
+    artefakty filmów są wspólnymi plikami, więc procesy dzielą jedną ich
+    kopię w page cache, a dane użytkowników są rozdzielone między shardy.
+    Shardy są tylko do odczytu: nowe oceny (add_ratings) wymagają
+    ponownego trenowania i partition().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.manifest = None
+        self.processes = []
+        self.router = None
+
+    @property
+    def ready(self):
+        return self.router is not None
+
+    def start(self, timeout=120):
+        """Uruchamia procesy shardów i czeka, aż każdy zgłosi swój adres"""
+        self.manifest = read_manifest(self.path)
+        if self.manifest is None:
+            raise FileNotFoundError(f"Brak shardow w {self.path} (uruchom partition)")
+        context = multiprocessing.get_context('spawn')
+        authkey = os.urandom(16)
+        readers = []
+        for shard in range(self.manifest['n_shards']):
+            reader, writer = context.Pipe(duplex=False)
+            process = context.Process(target=_serve_shard, args=(shard_path(self.path, shard), authkey, writer),
+                                      name=f"recommender-shard-{shard}", daemon=True)
+            process.start()
+            writer.close()
+            self.processes.append(process)
+            readers.append(reader)
+
+        addresses = []
+        for shard, reader in enumerate(readers):
+            if not reader.poll(timeout):
+                self.stop()
+                raise RuntimeError(f"Shard {shard} nie uruchomil sie w {timeout} s")
+            status, value = reader.recv()
+            if status == 'error':
+                self.stop()
+                raise RuntimeError(f"Blad uruchamiania shardu {shard}: {value}")
+            addresses.append(value)
+        self.router = ShardRouter(addresses, authkey)
+
+    def stop(self):
+        if self.router is not None:
+            self.router.close()
+            self.router = None
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+        self.processes = []
+
+    def stats(self):
+        return {
+            'shards': len(self.processes),
+            'alive': sum(process.is_alive() for process in self.processes),
+            'requests': list(self.router.requests) if self.router is not None else [],
+        }
+
+
+if __name__ == '__main__':
+    # python sharded_serving.py [katalog_modelu] [katalog_shardow] [liczba_shardow]
+    args = sys.argv[1:]
+    partition(args[0] if args else 'model', args[1] if len(args) > 1 else 'shards',
+              int(args[2]) if len(args) > 2 else os.cpu_count())
@@ -0,0 +1,284 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+# Największa liczba elementów tablicy gęstej przy wyborze top-k (paczka wierszy)
+DENSE_BLOCK_ELEMENTS = 1 << 22
+
+# Stan procesu roboczego puli (ustawiany raz przez _init_worker)
+_worker = {}
+
+
+def _top_k_mask(values, k):
+    """Maska k największych wartości w każdym wierszu tablicy (wartości -inf są pomijane)
+
+    Wybór przez np.partition (liniowo względem szerokości wiersza), bez
+    sortowania całego wiersza; remisy na granicy k rozstrzyga niższa pozycja.
+    """
+    if values.shape[1] <= k:
+        return values > -np.inf
+    kth = np.partition(values, values.shape[1] - k, axis=1)[:, -k, None]
+    above = values > kth
+    ties = values == kth
+    ties &= np.cumsum(ties, axis=1, dtype=np.int32) <= k - above.sum(axis=1, keepdims=True)
+    return (above | ties) & (values > -np.inf)
+
+
+def _top_k_entries(matrix, k):
+    """Maska wartości macierzy CSR (posortowane indeksy), które są w top-k swojego wiersza
+
+    Wiersze są przetwarzane paczkami jako tablice gęste o szerokości
+    najdłuższego wiersza (uzupełnione -inf), najwyżej DENSE_BLOCK_ELEMENTS
+    elementów naraz; remisy wg rosnącego indeksu kolumny.
+    """
+    counts = np.diff(matrix.indptr)
+    width = counts.max(initial=0)
+    keep = np.zeros(matrix.nnz, dtype=bool)
+    if width == 0:
+        return keep
+    chunk_rows = max(1, DENSE_BLOCK_ELEMENTS // width)
+    for start in range(0, matrix.shape[0], chunk_rows):
+        stop = min(start + chunk_rows, matrix.shape[0])
+        first, last = matrix.indptr[start], matrix.indptr[stop]
+        chunk_counts = counts[start:stop]
+        rows = np.repeat(np.arange(stop - start), chunk_counts)
+        positions = np.arange(last - first) - np.repeat(matrix.indptr[start:stop] - first, chunk_counts)
+        values = np.full((stop - start, chunk_counts.max(initial=0)), -np.inf)
+        values[rows, positions] = matrix.data[first:last]
+        keep[first:last] = _top_k_mask(values, k)[rows, positions]
+    return keep
+
+
+def keep_top_k_per_row(matrix, k):
+    """Zostawia w każdym wierszu macierzy CSR tylko k największych wartości"""
+    matrix = matrix.tocsr()
+    matrix.sort_indices()
+    counts = np.diff(matrix.indptr)
+    if counts.max(initial=0) <= k:
+        return matrix
+    keep = _top_k_entries(matrix, k)
+    rows = np.repeat(np.arange(matrix.shape[0]), counts)
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(rows[keep], minlength=matrix.shape[0]))])
+    return sparse.csr_matrix((matrix.data[keep], matrix.indices[keep], indptr), shape=matrix.shape)
+
+
+def _select_top_k(values, row_ids, k):
+    """Wybiera top-k wartości z każdego wiersza gęstego bloku podobieństw
+
+    Pomijane są wartości zerowe oraz podobieństwo wiersza do samego siebie
+    (row_ids to globalne numery wierszy bloku, -1 = bez pomijania);
+    values jest modyfikowane.
+    Sortowane są tylko wybrane wartości. Zwraca (wiersz w bloku, pozycja,
+    kolumna, wartość) posortowane malejąco wg podobieństwa, remisy wg
+    rosnącego indeksu.
+    """
+    values[values == 0] = -np.inf
+    own = row_ids >= 0
+    values[np.flatnonzero(own), row_ids[own]] = -np.inf
+    rows, cols = np.nonzero(_top_k_mask(values, k))
+    data = values[rows, cols]
+
+    order = np.lexsort((cols, -data, rows))
+    rows, cols, data = rows[order], cols[order], data[order]
+    counts = np.bincount(rows, minlength=len(values))
+    ranks = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return rows, ranks, cols, data
+
+
+def _top_k_rows(X_rows, X_t, row_ids, k, indices_out, scores_out):
+    """Top-k sąsiadów wierszy X_rows (globalne numery row_ids) zapisane do tablic wyjściowych
+
+    Podobieństwo liczone jest paczkami wierszy: iloczyn macierzy rzadkich
+    zamieniany na tablicę gęstą o najwyżej DENSE_BLOCK_ELEMENTS elementów.
+    """
+    chunk_rows = max(1, DENSE_BLOCK_ELEMENTS // max(X_t.shape[1], 1))
+    for start in range(0, X_rows.shape[0], chunk_rows):
+        stop = min(start + chunk_rows, X_rows.shape[0])
+        values = (X_rows[start:stop] @ X_t).toarray()
+        rows, ranks, cols, data = _select_top_k(values, row_ids[start:stop], k)
+        indices_out[start + rows, ranks] = cols
+        scores_out[start + rows, ranks] = data
+
+
+def _top_k_block(X, X_t, start, stop, k, indices_out, scores_out, exclude_self=True):
+    """Liczy top-k sąsiadów dla wierszy [start, stop) i zapisuje je do tablic wyjściowych"""
+    row_ids = np.arange(start, stop) if exclude_self else np.full(stop - start, -1)
+    _top_k_rows(X[start:stop], X_t, row_ids, k, indices_out[start:stop], scores_out[start:stop])
+
+
+def _init_worker(X, X_t, k, exclude_self, indices_name, scores_name):
+    """Podłącza proces roboczy do macierzy wejściowych i współdzielonych buforów wyników"""
+    n_rows = X.shape[0]
+    indices_shm = shared_memory.SharedMemory(name=indices_name)
+    scores_shm = shared_memory.SharedMemory(name=scores_name)
+    _worker.update(
+        X=X, X_t=X_t, k=k, exclude_self=exclude_self, shm=(indices_shm, scores_shm),
+        indices=np.ndarray((n_rows, k), dtype=np.int32, buffer=indices_shm.buf),
+        scores=np.ndarray((n_rows, k), dtype=np.float32, buffer=scores_shm.buf),
+    )
+
+
+def _run_block(start, stop):
+    _top_k_block(_worker['X'], _worker['X_t'], start, stop, _worker['k'],
+                 _worker['indices'], _worker['scores'], _worker['exclude_self'])
+
+
+def _row_groups(X):
+    """Numer grupy identycznych wierszy macierzy CSR dla każdego wiersza i pierwszy wiersz każdej grupy"""
+    X.sort_indices()
+    groups = {}
+    codes = np.fromiter(
+        (groups.setdefault(X.indices[a:b].tobytes() + X.data[a:b].tobytes(), len(groups))
+         for a, b in zip(X.indptr[:-1], X.indptr[1:])),
+        dtype=np.int64, count=X.shape[0]
+    )
+    return codes, np.unique(codes, return_index=True)[1]
+
+
+def _drop_self(indices, scores, k):
+    """Z k + 1 sąsiadów każdego wiersza usuwa sam wiersz (albo ostatniego sąsiada) - zostaje k"""
+    other = indices != np.arange(len(indices))[:, None]
+    keep = other & (np.cumsum(other, axis=1) <= k)
+    rows, cols = np.nonzero(keep)
+    positions = np.cumsum(keep, axis=1)[rows, cols] - 1
+    top_indices = np.full((len(indices), k), -1, dtype=np.int32)
+    top_scores = np.zeros((len(indices), k), dtype=np.float32)
+    top_indices[rows, positions] = indices[rows, cols]
+    top_scores[rows, positions] = scores[rows, cols]
+    return top_indices, top_scores
+
+
+def _top_k_neighbors(X, X_t, k, block_size, n_jobs, exclude_self=True):
+    """Top-k kolumn X_t dla każdego wiersza X (oba już znormalizowane) - bloki w procesie lub w puli"""
+    n_rows = X.shape[0]
+    blocks = [(start, min(start + block_size, n_rows)) for start in range(0, n_rows, block_size)]
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+
+    if n_jobs == 1 or len(blocks) <= 1:
+        indices = np.full((n_rows, k), -1, dtype=np.int32)
+        scores = np.zeros((n_rows, k), dtype=np.float32)
+        for start, stop in blocks:
+            _top_k_block(X, X_t, start, stop, k, indices, scores, exclude_self)
+        return indices, scores
+
+    indices_shm = shared_memory.SharedMemory(create=True, size=n_rows * k * 4)
+    scores_shm = shared_memory.SharedMemory(create=True, size=n_rows * k * 4)
+    try:
+        indices = np.ndarray((n_rows, k), dtype=np.int32, buffer=indices_shm.buf)
+        scores = np.ndarray((n_rows, k), dtype=np.float32, buffer=scores_shm.buf)
+        indices.fill(-1)
+        scores.fill(0)
+
+        with ProcessPoolExecutor(
+            max_workers=min(n_jobs, len(blocks)), initializer=_init_worker,
+            initargs=(X, X_t, k, exclude_self, indices_shm.name, scores_shm.name)
+        ) as pool:
+            for future in [pool.submit(_run_block, start, stop) for start, stop in blocks]:
+                future.result()
+
+        indices, scores = indices.copy(), scores.copy()
+    finally:
+        indices_shm.close()
+        indices_shm.unlink()
+        scores_shm.close()
+        scores_shm.unlink()
+    return indices, scores
+
+
+def top_k_cosine_neighbors(X, k, block_size=1024, n_jobs=1, unique_rows=False):
+    """Top-k najbardziej podobnych wierszy X (cosinus), liczone blokami wierszy
+
+    Zwraca tablice (indeksy, wyniki) o kształcie (liczba wierszy, k);
+    brakujące pozycje mają indeks -1 i wynik 0. Pamięć pośrednia jest
+    ograniczona do jednego bloku iloczynu zamiast pełnej macierzy N x N.
+
+    Przy n_jobs > 1 bloki są liczone w puli procesów, które zapisują wyniki
+    do współdzielonego bufora (n_jobs=-1 = wszystkie rdzenie). Każdy wiersz
+    zależy tylko od danych wejściowych, więc wynik nie zależy od n_jobs.
+
+    unique_rows=True opłaca się, gdy wiele wierszy jest identycznych (np.
+    cechy filmów): top-(k + 1) liczone jest raz na grupę identycznych
+    wierszy, a każdy wiersz dostaje listę grupy bez siebie samego. Wynik
+    jest taki sam jak bez tej opcji.
+    """
+    X = normalize(sparse.csr_matrix(X, dtype=np.float64), norm='l2')
+    X_t = X.T.tocsr()
+    if unique_rows:
+        groups, first = _row_groups(X)
+        indices, scores = _top_k_neighbors(X[first], X_t, k + 1, block_size, n_jobs, exclude_self=False)
+        return _drop_self(indices[groups], scores[groups], k)
+    return _top_k_neighbors(X, X_t, k, block_size, n_jobs)
+
+
+def cosine_rows(X, rows):
+    """Podobieństwo cosinusowe wybranych wierszy X do wszystkich wierszy (CSR)"""
+    X = normalize(sparse.csr_matrix(X, dtype=np.float64), norm='l2')
+    return (X[rows] @ X.T).tocsr()
+
+
+def top_k_cosine_rows(X, rows, k):
+    """Top-k sąsiadów (jak w top_k_cosine_neighbors) tylko dla wybranych wierszy X"""
+    rows = np.asarray(rows)
+    X = normalize(sparse.csr_matrix(X, dtype=np.float64), norm='l2')
+    indices = np.full((len(rows), k), -1, dtype=np.int32)
+    scores = np.zeros((len(rows), k), dtype=np.float32)
+    _top_k_rows(X[rows], X.T.tocsr(), rows, k, indices, scores)
+    return indices, scores
+
+
+def resize_csr(matrix, shape):
+    """Powiększa macierz CSR do podanego kształtu (nowe wiersze/kolumny są puste)"""
+    extra_rows = shape[0] - matrix.shape[0]
+    indptr = np.concatenate([matrix.indptr, np.full(extra_rows, matrix.indptr[-1])])
+    return sparse.csr_matrix((matrix.data, matrix.indices, indptr), shape=shape)
+
+
+def replace_rows(matrix, rows, new_rows, symmetric=False):
+    """Podmienia wskazane wiersze macierzy CSR na new_rows
+
+    Przy symmetric=True podmieniane są też odpowiadające im kolumny
+    (dla symetrycznych macierzy podobieństwa).
+    """
+    old = matrix.tocoo()
+    new = new_rows.tocoo()
+    rows = np.asarray(rows)
+
+    keep = ~np.isin(old.row, rows)
+    parts_row, parts_col, parts_data = [old.row[keep]], [old.col[keep]], [old.data[keep]]
+    if symmetric:
+        keep_col = ~np.isin(parts_col[0], rows)
+        parts_row, parts_col, parts_data = [parts_row[0][keep_col]], [parts_col[0][keep_col]], [parts_data[0][keep_col]]
+        # Kolumny podmienianych wierszy = transpozycja nowych wierszy
+        mirrored = ~np.isin(new.col, rows)
+        parts_row.append(new.col[mirrored])
+        parts_col.append(rows[new.row[mirrored]])
+        parts_data.append(new.data[mirrored])
+
+    parts_row.append(rows[new.row])
+    parts_col.append(new.col)
+    parts_data.append(new.data)
+
+    result = sparse.csr_matrix(
+        (np.concatenate(parts_data).astype(matrix.dtype),
+         (np.concatenate(parts_row), np.concatenate(parts_col))),
+        shape=matrix.shape
+    )
+    result.sort_indices()
+    return result
+
+
+def neighbors_to_csr(indices, scores, n_cols):
+    """Zamienia tablice sąsiadów (z wypełnieniem -1) na macierz CSR k sąsiadów na wiersz"""
+    valid = indices >= 0
+    indptr = np.concatenate([[0], np.cumsum(valid.sum(axis=1))])
+    matrix = sparse.csr_matrix(
+        (scores[valid], indices[valid], indptr),
+        shape=(len(indices), n_cols)
+    )
+    matrix.sort_indices()
+    return matrix
@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from generate_movie_data import write_dataset
+from movie_recommendation_system import MovieRecommendationSystem
+
+# Mały, powtarzalny zbiór danych testów (stały seed i data ostatniej oceny)
+N_USERS = 120
+N_MOVIES = 40
+
+
+@pytest.fixture(scope='session')
+def data_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp('data')
+    write_dataset(str(path), N_USERS, N_MOVIES, seed=7, end_time='2025-01-01')
+    return str(path)
+
+
+@pytest.fixture(scope='session')
+def train(data_dir):
+    """Trenuje nowy system rekomendacji na danych testowych"""
+    def train(similarity_top_k=None, n_jobs=1):
+        recommender = MovieRecommendationSystem()
+        assert recommender.train_model(similarity_top_k, n_jobs, data_dir=data_dir)
+        return recommender
+    return train
+
+
+def assert_same_recommendations(actual, expected, atol=1e-4):
+    """Te same filmy i wyniki (z tolerancją); filmy o prawie równych wynikach mogą zamienić się miejscami"""
+    assert len(actual) == len(expected)
+    for position, (got, want) in enumerate(zip(actual, expected)):
+        assert got.score == pytest.approx(want.score, abs=atol)
+        if got.movie_id != want.movie_id:
+            tied = [other for other in expected if other is not want and abs(other.score - want.score) <= atol]
+            assert tied or position == len(expected) - 1
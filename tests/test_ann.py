@@ -0,0 +1,24 @@
+import numpy as np
+
+from conftest import assert_same_recommendations
+
+
+def test_quantized_ann_reranks_candidates_exactly(train):
+    recommender = train()
+    recommender.quantize_user_factors()
+    user_ids = [int(user_id) for user_id in recommender.user_index[:40]]
+    exact = {user_id: recommender.get_svd_recommendations(user_id, 10) for user_id in user_ids}
+
+    recommender.build_ann_index()
+    all_lists = len(recommender.ann_index.centroids)
+    components = recommender.svd_model.components_
+    for user_id in user_ids:
+        # Przy przeszukaniu wszystkich list - ten sam wynik co ścieżka dokładna
+        assert_same_recommendations(recommender.get_svd_recommendations(user_id, 10, n_probe=all_lists), exact[user_id])
+
+        # Przy dobranym n_probe wyniki to dokładne (float) wyniki SVD zwróconych filmów
+        approximate = recommender.get_svd_recommendations(user_id, 10)
+        user_factor = recommender.user_movie_matrix[recommender.user_index.get_loc(user_id)] @ components.T
+        columns = recommender.movie_index.get_indexer([item.movie_id for item in approximate])
+        np.testing.assert_allclose([item.score for item in approximate], (user_factor @ components[:, columns])[0],
+                                   rtol=1e-5, atol=1e-5)
@@ -0,0 +1,23 @@
+import os
+
+import pandas as pd
+import pytest
+
+from ratings_io import iter_rating_chunks, read_ratings
+
+
+@pytest.mark.parametrize('extension', ['.parquet', '.feather'])
+def test_columnar_formats_match_csv(data_dir, tmp_path, extension):
+    pa = pytest.importorskip('pyarrow')
+    csv_path = os.path.join(data_dir, 'ratings.csv')
+    path = os.path.join(tmp_path, 'ratings' + extension)
+    table = pa.Table.from_pandas(pd.read_csv(csv_path), preserve_index=False)
+    if extension == '.parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, path, row_group_size=700)
+    else:
+        import pyarrow.feather as feather
+        feather.write_feather(table, path, chunksize=700)
+
+    pd.testing.assert_frame_equal(read_ratings(path, chunksize=500), read_ratings(csv_path, chunksize=500))
+    assert max(len(chunk['user_id']) for chunk in iter_rating_chunks(path, 300)) == 300
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.metrics.pairwise import cosine_similarity
+
+from conftest import assert_same_recommendations
+from movie_recommendation_system import MovieRecommendationSystem, HIGH_RATING
+from similarity import top_k_cosine_neighbors
+
+METHODS = ('collaborative', 'content', 'svd', 'als')
+
+
+def _dense_ratings(recommender):
+    return recommender.user_movie_matrix.toarray().astype(np.float64)
+
+
+def _reference_top(predictions, n):
+    """Top N jak w pierwotnej wersji: sortowanie słownika movie_id -> wynik (remisy wg kolejności filmów)"""
+    return sorted(predictions.items(), key=lambda item: item[1], reverse=True)[:n]
+
+
+def reference_collaborative(recommender, user_id, n):
+    """Pierwotny algorytm collaborative filtering (pętle po filmach i użytkownikach)"""
+    ratings = _dense_ratings(recommender)
+    similarity = cosine_similarity(ratings)
+    user = recommender.user_index.get_loc(user_id)
+    predictions = {}
+    for movie in np.flatnonzero(ratings[user] == 0):
+        weighted_sum = similarity_sum = 0.0
+        for other in range(len(ratings)):
+            if other != user and ratings[other, movie] > 0:
+                weighted_sum += similarity[user, other] * ratings[other, movie]
+                similarity_sum += abs(similarity[user, other])
+        if similarity_sum > 0:
+            predictions[movie] = weighted_sum / similarity_sum
+    return _reference_top(predictions, n)
+
+
+def reference_content(recommender, user_id, n):
+    """Pierwotny algorytm content-based (podobieństwo filmów do wysoko ocenionych)"""
+    ratings = _dense_ratings(recommender)
+    similarity = cosine_similarity(ratings.T)
+    user_ratings = ratings[recommender.user_index.get_loc(user_id)]
+    predictions = {}
+    for liked in np.flatnonzero(user_ratings >= HIGH_RATING):
+        for movie in np.flatnonzero(user_ratings == 0):
+            predictions[movie] = predictions.get(movie, 0) + similarity[liked, movie] * user_ratings[liked]
+    return _reference_top(predictions, n)
+
+
+def _check_against_reference(recommendations, reference, recommender):
+    assert len(recommendations) == len(reference)
+    for item, (movie, score) in zip(recommendations, reference):
+        assert item.score == pytest.approx(score, abs=1e-4)
+    expected_scores = dict(reference)
+    for item in recommendations:
+        movie = recommender.movie_index.get_loc(item.movie_id)
+        if movie not in expected_scores:
+            # Zamiana miejsc z filmem o prawie równym wyniku na granicy top N
+            assert item.score == pytest.approx(reference[-1][1], abs=1e-4)
+
+
+def test_collaborative_matches_reference(train):
+    recommender = train()
+    for user_id in recommender.user_index[:20]:
+        _check_against_reference(recommender.get_user_recommendations_collaborative(int(user_id), 10),
+                                 reference_collaborative(recommender, user_id, 10), recommender)
+
+
+def test_content_matches_reference(train):
+    recommender = train()
+    for user_id in recommender.user_index[:20]:
+        _check_against_reference(recommender.get_movie_recommendations_content(int(user_id), 10),
+                                 reference_content(recommender, user_id, 10), recommender)
+
+
+def test_results_do_not_depend_on_n_jobs(train):
+    single, parallel = train(similarity_top_k=10), train(similarity_top_k=10, n_jobs=2)
+    assert (single.user_similarity != parallel.user_similarity).nnz == 0
+    assert (single.movie_similarity != parallel.movie_similarity).nnz == 0
+    for user_id in single.user_index[:30]:
+        for method in METHODS:
+            assert single.recommend(int(user_id), method, 10) == parallel.recommend(int(user_id), method, 10)
+
+
+def test_top_k_neighbors_do_not_depend_on_n_jobs(train):
+    ratings = train().user_movie_matrix
+    single = top_k_cosine_neighbors(ratings, 5, block_size=16)
+    parallel = top_k_cosine_neighbors(ratings, 5, block_size=16, n_jobs=2)
+    np.testing.assert_array_equal(single[0], parallel[0])
+    np.testing.assert_array_equal(single[1], parallel[1])
+
+
+def test_batch_matches_single_requests(train):
+    recommender = train(similarity_top_k=10)
+    user_ids = recommender.user_index[:40]
+    for method in METHODS:
+        batch = recommender.recommend_batch(user_ids, method, 5, chunk_size=16)
+        for user_id in user_ids:
+            single = recommender.recommend(int(user_id), method, 5)
+            rows = batch[batch['user_id'] == user_id]
+            assert rows['movie_id'].tolist() == [item.movie_id for item in single]
+            np.testing.assert_allclose(rows['score'], [item.score for item in single], atol=1e-5)
+
+
+@pytest.mark.parametrize('similarity_top_k', [None, 10])
+def test_hybrid_lists_match_single_methods(train, similarity_top_k):
+    recommender = train(similarity_top_k=similarity_top_k)
+    for user_id in recommender.user_index[:30]:
+        hybrid = recommender.get_hybrid_recommendations(int(user_id), 10)
+        for method in METHODS:
+            assert_same_recommendations(hybrid.methods[method].items,
+                                        recommender.recommend(int(user_id), method, 10).items)
+
+
+def test_hybrid_for_user_without_high_ratings(train):
+    recommender = train(similarity_top_k=10)
+    user_id = int(recommender.user_index.max()) + 1
+    recommender.add_ratings(pd.DataFrame({'user_id': [user_id, user_id],
+                                          'movie_id': recommender.movie_index[:2].tolist(),
+                                          'rating': [2, 1], 'timestamp': ['2025-02-01 12:00:00'] * 2}))
+    hybrid = recommender.get_hybrid_recommendations(user_id, 10)
+    assert hybrid.methods['content'].message is not None
+    for method in ('collaborative', 'svd', 'als'):
+        assert_same_recommendations(hybrid.methods[method].items, recommender.recommend(user_id, method, 10).items)
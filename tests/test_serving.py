@@ -0,0 +1,48 @@
+import os
+import time
+
+from async_serving import AsyncRecommendationService
+from conftest import assert_same_recommendations
+from movie_recommendation_system import MovieRecommendationSystem
+from sharded_serving import partition, shard_path, user_shards
+
+METHODS = ('collaborative', 'content', 'svd', 'als')
+
+
+def test_async_service_matches_direct_calls(train):
+    recommender = train(similarity_top_k=10)
+    service = AsyncRecommendationService(max_batch_size=16, batch_window=0.01)
+    service.start(lambda: recommender)
+    deadline = time.monotonic() + 30
+    while not service.ready and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert service.ready
+
+    user_ids = [int(user_id) for user_id in recommender.user_index[:40]]
+    for method in METHODS:
+        futures = [service.submit(user_id, method, 5) for user_id in user_ids + user_ids[:5]]
+        for user_id, future in zip(user_ids + user_ids[:5], futures):
+            assert_same_recommendations(future.result(timeout=30), recommender.recommend(user_id, method, 5))
+    assert service.batches < service.requests
+    service.loop.call_soon_threadsafe(service.loop.stop)
+
+
+def test_shards_match_single_process(train, tmp_path):
+    recommender = train(similarity_top_k=10)
+    model_dir, shards_dir = os.path.join(tmp_path, 'model'), os.path.join(tmp_path, 'shards')
+    recommender.save(model_dir)
+    manifest = partition(model_dir, shards_dir, 3)
+    assert sum(shard['users'] for shard in manifest['shards']) == len(recommender.user_index)
+
+    owners = user_shards(recommender.user_index, 3)
+    for shard in range(3):
+        subset = MovieRecommendationSystem.load(shard_path(shards_dir, shard))
+        owned = recommender.user_index[owners == shard]
+        assert sorted(subset.user_index) == sorted(owned)
+        for user_id in owned[:15]:
+            for method in METHODS:
+                assert_same_recommendations(subset.recommend(int(user_id), method, 10),
+                                            recommender.recommend(int(user_id), method, 10))
+            assert_same_recommendations(subset.get_hybrid_recommendations(int(user_id), 10).blended,
+                                        recommender.get_hybrid_recommendations(int(user_id), 10).blended)
+            assert subset.get_user_profile(int(user_id)) == recommender.get_user_profile(int(user_id))
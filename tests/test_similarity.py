@@ -0,0 +1,50 @@
+import numpy as np
+from scipy import sparse
+from sklearn.metrics.pairwise import cosine_similarity
+
+from similarity import keep_top_k_per_row, top_k_cosine_neighbors
+
+
+def _ties_matrix(n_rows=200, n_cols=12, seed=0):
+    """Macierz o wielu identycznych wierszach i równych podobieństwach"""
+    rng = np.random.default_rng(seed)
+    X = sparse.random(n_rows, n_cols, density=0.3, random_state=seed, format='csr')
+    X.data = np.ceil(X.data * 3)
+    return sparse.vstack([X, X[rng.choice(n_rows, n_rows // 2)]]).tocsr()
+
+
+def reference_top_k(X, k):
+    """Top-k sąsiadów przez pełne sortowanie wierszy (malejąco, remisy wg indeksu), bez zer i przekątnej"""
+    similarity = cosine_similarity(X)
+    indices = np.full((len(similarity), k), -1)
+    scores = np.zeros((len(similarity), k), dtype=np.float32)
+    for row, values in enumerate(similarity):
+        columns = [col for col in np.lexsort((np.arange(len(values)), -values)) if col != row and values[col] != 0][:k]
+        indices[row, :len(columns)] = columns
+        scores[row, :len(columns)] = values[columns]
+    return indices, scores
+
+
+def test_top_k_neighbors_match_full_sort():
+    X = _ties_matrix()
+    for k in (1, 5, 40):
+        expected = reference_top_k(X, k)
+        for unique_rows in (False, True):
+            indices, scores = top_k_cosine_neighbors(X, k, block_size=64, unique_rows=unique_rows)
+            np.testing.assert_array_equal(indices, expected[0])
+            np.testing.assert_allclose(scores, expected[1], atol=1e-6)
+
+
+def test_keep_top_k_per_row_matches_full_sort():
+    matrix = sparse.random(50, 80, density=0.4, random_state=1, format='csr')
+    matrix.data = np.round(matrix.data * 4) - 2
+    top = keep_top_k_per_row(matrix, 7).toarray()
+    dense = matrix.toarray()
+    stored = matrix.copy()
+    stored.data[:] = 1
+    for row in range(len(dense)):
+        columns = np.flatnonzero(stored[row].toarray()[0])
+        columns = columns[np.lexsort((columns, -dense[row, columns]))][:7]
+        expected = np.zeros(dense.shape[1])
+        expected[columns] = dense[row, columns]
+        np.testing.assert_array_equal(top[row], expected)
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from conftest import assert_same_recommendations
+from movie_recommendation_system import MovieRecommendationSystem
+
+
+def _new_ratings(recommender):
+    """Zmiana istniejącej oceny, nowa ocena znanego użytkownika i nowy użytkownik"""
+    first_user = int(recommender.user_index[0])
+    rated = recommender.ratings_df.loc[recommender.ratings_df['user_id'] == first_user, 'movie_id']
+    unrated = np.setdiff1d(recommender.movie_index, rated)
+    new_user = int(recommender.user_index.max()) + 1
+    movies = recommender.movie_index
+    return pd.DataFrame({
+        'user_id': [first_user, first_user, new_user, new_user, new_user],
+        'movie_id': [int(rated.iloc[0]), int(unrated[0]), int(movies[0]), int(movies[1]), int(movies[2])],
+        'rating': [1, 5, 5, 4, 2],
+        'timestamp': ['2025-02-01 12:00:00'] * 5,
+    })
+
+
+def _rebuilt(recommender):
+    """Macierz ocen i pełne podobieństwa policzone od zera z tych samych ocen"""
+    rebuilt = MovieRecommendationSystem()
+    rebuilt.ratings_df = recommender.ratings_df.copy()
+    rebuilt.movies_df, rebuilt.users_df = recommender.movies_df, recommender.users_df
+    rebuilt.create_lookups()
+    rebuilt.create_user_movie_matrix()
+    rebuilt.create_rating_index()
+    rebuilt.calculate_user_similarity()
+    rebuilt.calculate_movie_similarity()
+    return rebuilt
+
+
+def test_add_ratings_matches_rebuild_with_full_similarity(train):
+    recommender = train()
+    new_ratings = _new_ratings(recommender)
+    recommender.add_ratings(new_ratings)
+    rebuilt = _rebuilt(recommender)
+
+    assert not recommender.ratings_df.duplicated(['user_id', 'movie_id']).any()
+    assert list(recommender.user_index) == list(rebuilt.user_index)
+    assert abs(recommender.user_movie_matrix - rebuilt.user_movie_matrix).max() == 0
+    np.testing.assert_allclose(recommender.user_similarity.toarray(), rebuilt.user_similarity.toarray(), atol=1e-6)
+    np.testing.assert_allclose(recommender.movie_similarity.toarray(), rebuilt.movie_similarity.toarray(), atol=1e-6)
+    for user_id in new_ratings['user_id'].unique():
+        assert_same_recommendations(recommender.get_user_recommendations_collaborative(int(user_id), 10),
+                                    rebuilt.get_user_recommendations_collaborative(int(user_id), 10))
+        assert_same_recommendations(recommender.get_movie_recommendations_content(int(user_id), 10),
+                                    rebuilt.get_movie_recommendations_content(int(user_id), 10))
+
+
+def test_refit_after_add_ratings_matches_training_from_scratch(train):
+    recommender = train()
+    recommender.add_ratings(_new_ratings(recommender))
+    recommender.refit()
+    rebuilt = _rebuilt(recommender)
+    rebuilt.train_svd_model()
+    for user_id in recommender.user_index[:20]:
+        assert_same_recommendations(recommender.get_svd_recommendations(int(user_id), 10),
+                                    rebuilt.get_svd_recommendations(int(user_id), 10))